@@ -165,7 +165,7 @@ def run_interactive_mode(data_path: str = 'data/Indian_Names.csv'):
             
             # Run the matcher
             result = matcher.match(user_input, top_k)
-            result_dict = result.to_dict()
+            result_dict = result.to_display_dict()
             
             # Handle errors
             if result.error:
@@ -202,7 +202,7 @@ def run_command_line_mode(args):
     # Run matcher
     matcher = NameMatcher(index)
     result = matcher.match(args.name, args.top_k)
-    result_dict = result.to_dict()
+    result_dict = result.to_display_dict()
     
     # Handle errors
     if result.error:
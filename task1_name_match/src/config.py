@@ -1,9 +1,16 @@
 # Weights, penalties, index constants (all tunable in one place)
 
+import os
+from pathlib import Path
+
 # Indexing
 MIN_SHORTLIST = 30  # Minimum candidates to consider before fallback
 MAX_SHORTLIST = 2000  # Cap shortlist to avoid performance issues
 
+# On-disk cache of the built index (keyed by CSV path, mtime, size); override with BOOKXPERT_CACHE_DIR
+INDEX_CACHE_DIR = Path(os.environ.get('BOOKXPERT_CACHE_DIR', Path.home() / '.cache' / 'bookxpert'))
+INDEX_CACHE_VERSION = 13  # Bump when the pickled index layout changes
+
 # Scoring weights (sum to 1.0)
 WEIGHT_FIRST_NAME = 0.30
 WEIGHT_EDIT_DISTANCE = 0.15
@@ -1,17 +1,23 @@
-# Phonetic index: key -> candidate indices. Query hits a bucket instead of scanning all. Fallback: first-letter bucket, then full scan.
+# Phonetic index: key -> candidate indices (CSR arrays). Query hits a bucket instead of scanning all. Fallback: first-letter bucket, then full scan.
 
 import csv
+import hashlib
+import pickle
+import sys
+from collections import defaultdict
 from pathlib import Path
 from typing import List, Dict, Optional, Set
 from dataclasses import dataclass
 
+import numpy as np
+
 from src.normalize import normalize_text, tokenize, is_valid_name
-from src.phonetic import phonetic_key_for_index, first_letter_key, phonetic_core_string
-from src.initials import classify_tokens, ClassifiedTokens
-from src.config import MIN_SHORTLIST, MAX_SHORTLIST
+from src.phonetic import phonetic_key_for_index, first_letter_key
+from src.initials import classify_tokens, ClassifiedTokens, ASCII_LETTER_MASK
+from src.config import MIN_SHORTLIST, MAX_SHORTLIST, INDEX_CACHE_DIR, INDEX_CACHE_VERSION
 
 
-@dataclass
+@dataclass(slots=True)
 class Candidate:
     """One preprocessed candidate (original, normalized, classified, keys)."""
     original: str
@@ -26,34 +32,116 @@ class Candidate:
 class NameIndex:
     """In-memory index: load from CSV, then shortlist by phonetic key (or fallback)."""
     
+    # State persisted by the on-disk cache
+    _CACHE_FIELDS = (
+        'candidates', 'first_letter_index',
+        'phonetic_keys', 'phonetic_offsets', 'phonetic_values',
+        'normalized_arr', 'phonetic_core_arr', 'first_core_arr', 'phonetic_first_arr',
+        'classified_arr', 'core_count_arr', 'first_len_arr', 'phonetic_first_len_arr',
+        'initials_mask_arr', 'remaining_first_mask_arr', 'wide_mask_arr',
+        'remaining_flat_arr', 'phonetic_remaining_flat_arr', 'remaining_offsets',
+    )
+    
     def __init__(self):
         self.candidates: List[Candidate] = []
-        self.phonetic_index: Dict[str, List[int]] = {}
-        self.first_letter_index: Dict[str, List[int]] = {}
-        self._normalized_set: Set[str] = set()  # For deduplication
+        self.first_letter_index: Dict[str, List[int]] = defaultdict(list)
+        # Dedup set, only alive while loading; rebuilt from candidates if another load follows
+        self._normalized_set: Optional[Set[str]] = set()
+        self.version = 0  # Bumped on every load so per-query caches keyed on it go stale
+        
+        # Phonetic index as CSR: bucket i of sorted phonetic_keys is phonetic_values[offsets[i]:offsets[i+1]]
+        self.phonetic_keys = np.array([], dtype=str)
+        self.phonetic_offsets = np.zeros(1, dtype=np.int32)
+        self.phonetic_values = np.array([], dtype=np.int32)
+        
+        # Column views of candidates (one entry per candidate) for batch access. String columns stay str objects:
+        # rapidfuzz reads their internal buffers directly, so a padded byte matrix would only add a conversion
+        self.normalized_arr = np.array([], dtype=object)
+        self.phonetic_core_arr = np.array([], dtype=object)
+        self.first_core_arr = np.array([], dtype=object)
+        self.phonetic_first_arr = np.array([], dtype=object)
+        self.classified_arr = np.array([], dtype=object)
+        self.core_count_arr = np.array([], dtype=np.int64)  # len(core_tokens)
+        self.first_len_arr = np.array([], dtype=np.int64)   # len(first_core)
+        self.phonetic_first_len_arr = np.array([], dtype=np.int64)
+        # Letter masks as uint32 (a-z only); wide_mask_arr marks candidates whose masks need other bits
+        self.initials_mask_arr = np.array([], dtype=np.uint32)
+        self.remaining_first_mask_arr = np.array([], dtype=np.uint32)
+        self.wide_mask_arr = np.array([], dtype=bool)
+        
+        # Non-first cores of all candidates, flattened (CSR): candidate i owns flat[offsets[i]:offsets[i+1]]
+        self.remaining_flat_arr = np.array([], dtype=object)
+        self.phonetic_remaining_flat_arr = np.array([], dtype=object)
+        self.remaining_offsets = np.zeros(1, dtype=np.int64)
     
-    def load_from_csv(self, csv_path: str) -> int:
-        """Load candidates from CSV (expects 'name' or 'Name' column). Returns count."""
+    def load_from_csv(self, csv_path: str, use_cache: bool = True) -> int:
+        """Load candidates from CSV (expects a 'name' column, any case). Returns count.
+        
+        An empty index is restored from the pickle cache when the CSV is unchanged; otherwise built and cached.
+        """
         path = Path(csv_path)
         if not path.exists():
             raise FileNotFoundError(f"Names file not found: {csv_path}")
         
-        with open(path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                # Handle both 'name' and 'Name' column names (case-insensitive)
-                name = row.get('name') or row.get('Name') or ''
-                name = name.strip()
-                if name:
-                    self._add_candidate(name)
+        # Only a fresh index can be swapped wholesale for the cached one
+        cache_path = _cache_path_for(path) if use_cache and not self.candidates else None
+        if cache_path is not None and self._load_cache(cache_path):
+            return len(self.candidates)
+        
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            # Name column found once from the header (case-insensitive); rows are then indexed directly
+            name_col = next((i for i, h in enumerate(header) if h.strip().lower() == 'name'), None)
+            if name_col is not None:
+                for row in reader:
+                    if len(row) <= name_col:
+                        continue
+                    name = row[name_col].strip()
+                    if name:
+                        self._add_candidate(name)
+        
+        self._build_arrays()
+        self._normalized_set = None
+        if cache_path is not None:
+            self._save_cache(cache_path)
         
         return len(self.candidates)
     
+    def _load_cache(self, cache_path: Path) -> bool:
+        """Restore state from a cache file. False if missing or unreadable."""
+        try:
+            with open(cache_path, 'rb') as f:
+                state = pickle.load(f)
+        except Exception:
+            # Corrupt or incompatible cache: rebuild from the CSV instead
+            return False
+        if not isinstance(state, dict) or set(state) != set(self._CACHE_FIELDS):
+            return False
+        self.__dict__.update(state)
+        self._normalized_set = None
+        self.version += 1
+        return True
+    
+    def _save_cache(self, cache_path: Path) -> None:
+        """Write state to a cache file; failures (e.g. read-only home) are ignored."""
+        state = {name: getattr(self, name) for name in self._CACHE_FIELDS}
+        tmp_path = cache_path.with_suffix('.tmp')
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(state, f, protocol=5)
+            tmp_path.replace(cache_path)
+        except OSError:
+            pass
+    
     def load_from_list(self, names: List[str]) -> int:
         """Load candidates from a list (for tests)."""
         for name in names:
             if name and name.strip():
                 self._add_candidate(name.strip())
+        self._build_arrays()
+        self._normalized_set = None
         return len(self.candidates)
     
     def _add_candidate(self, name: str) -> Optional[int]:
@@ -63,18 +151,23 @@ class NameIndex:
         if not is_valid_name(normalized):
             return None
         
+        if self._normalized_set is None:
+            self._normalized_set = {c.normalized for c in self.candidates}
         if normalized in self._normalized_set:
             return None
+        normalized = sys.intern(normalized)
         self._normalized_set.add(normalized)
         
-        tokens = tokenize(normalized)
+        # Interned so common parts (kumar, singh, initials) share one object across candidates;
+        # classified lists reuse these same token objects
+        tokens = [sys.intern(t) for t in tokenize(normalized)]
         classified = classify_tokens(tokens)
         
         # Compute phonetic representations
         first_core = classified.first_core
-        phonetic_core = phonetic_core_string(classified.core_tokens)
-        phonetic_key = phonetic_key_for_index(first_core) if first_core else "___"
-        first_letter = first_letter_key(first_core) if first_core else "_"
+        phonetic_core = sys.intern(classified.phonetic_core_joined)
+        phonetic_key = sys.intern(phonetic_key_for_index(first_core) if first_core else "___")
+        first_letter = sys.intern(first_letter_key(first_core) if first_core else "_")
         
         # Create candidate
         candidate = Candidate(
@@ -90,45 +183,134 @@ class NameIndex:
         idx = len(self.candidates)
         self.candidates.append(candidate)
         
-        # Add to phonetic index
-        if phonetic_key not in self.phonetic_index:
-            self.phonetic_index[phonetic_key] = []
-        self.phonetic_index[phonetic_key].append(idx)
-        
-        # Add to first-letter index
-        if first_letter not in self.first_letter_index:
-            self.first_letter_index[first_letter] = []
+        # Add to first-letter index (phonetic index is built from candidates in _build_arrays)
         self.first_letter_index[first_letter].append(idx)
         
         return idx
     
-    def get_shortlist(self, query_phonetic_key: str, query_first_letter: str) -> List[int]:
-        """Indices to score: phonetic bucket; if small add first-letter; if empty full scan; cap at MAX_SHORTLIST."""
-        indices: Set[int] = set()
+    def _build_arrays(self) -> None:
+        """Rebuild the CSR phonetic index and column arrays from candidates (end of every load)."""
+        self.version += 1
+        n = len(self.candidates)
+        keys = np.array([c.phonetic_key for c in self.candidates], dtype=str)
+        # Stable sort keeps each bucket in ascending candidate order
+        order = np.argsort(keys, kind='stable').astype(np.int32)
+        self.phonetic_keys, starts = np.unique(keys[order], return_index=True)
+        self.phonetic_offsets = np.append(starts, n).astype(np.int32)
+        self.phonetic_values = order
+        
+        self.normalized_arr = np.array([c.normalized for c in self.candidates], dtype=object)
+        self.phonetic_core_arr = np.array([c.phonetic_core for c in self.candidates], dtype=object)
+        self.first_core_arr = np.array([c.classified.first_core for c in self.candidates], dtype=object)
+        self.phonetic_first_arr = np.array([c.classified.phonetic_first for c in self.candidates], dtype=object)
+        self.classified_arr = np.empty(n, dtype=object)
+        self.classified_arr[:] = [c.classified for c in self.candidates]
+        self.core_count_arr = np.array([len(c.classified.core_tokens) for c in self.candidates], dtype=np.int64)
+        self.first_len_arr = np.array([len(c.classified.first_core) for c in self.candidates], dtype=np.int64)
+        self.phonetic_first_len_arr = np.array(
+            [len(c.classified.phonetic_first) for c in self.candidates], dtype=np.int64
+        )
+        
+        wide = [
+            (c.classified.initials_mask | c.classified.remaining_first_mask) > ASCII_LETTER_MASK
+            for c in self.candidates
+        ]
+        self.wide_mask_arr = np.array(wide, dtype=bool)
+        self.initials_mask_arr = np.array([
+            0 if w else c.classified.initials_mask for c, w in zip(self.candidates, wide)
+        ], dtype=np.uint32)
+        self.remaining_first_mask_arr = np.array([
+            0 if w else c.classified.remaining_first_mask for c, w in zip(self.candidates, wide)
+        ], dtype=np.uint32)
+        
+        self.remaining_flat_arr = np.array(
+            [t for c in self.candidates for t in c.classified.remaining_core], dtype=object
+        )
+        self.phonetic_remaining_flat_arr = np.array(
+            [t for c in self.candidates for t in c.classified.phonetic_remaining], dtype=object
+        )
+        counts = np.array([len(c.classified.remaining_core) for c in self.candidates], dtype=np.int64)
+        self.remaining_offsets = np.concatenate(([0], np.cumsum(counts)))
+    
+    def remaining_cores_for(self, indices: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Flattened (remaining cores, phonetic remaining cores, per-candidate counts) for indices, in order."""
+        starts = self.remaining_offsets[indices]
+        counts = self.remaining_offsets[indices + 1] - starts
+        # Flat position of every owned core: segment start plus offset within the segment
+        seg_starts = np.cumsum(counts) - counts
+        positions = np.arange(int(counts.sum())) + np.repeat(starts - seg_starts, counts)
+        return self.remaining_flat_arr[positions], self.phonetic_remaining_flat_arr[positions], counts
+    
+    def _phonetic_bucket(self, key: str) -> np.ndarray:
+        """Candidate indices whose phonetic key equals key (O(log K) lookup)."""
+        i = int(np.searchsorted(self.phonetic_keys, key))
+        if i < len(self.phonetic_keys) and self.phonetic_keys[i] == key:
+            return self.phonetic_values[self.phonetic_offsets[i]:self.phonetic_offsets[i + 1]]
+        return self.phonetic_values[:0]
+    
+    def _neighbor_buckets(self, key: str) -> np.ndarray:
+        """Candidate indices whose phonetic key differs from key in exactly one position."""
+        keys = self.phonetic_keys
+        if len(keys) == 0 or keys.dtype.itemsize != 4 * len(key):
+            return self.phonetic_values[:0]
         
-        if query_phonetic_key in self.phonetic_index:
-            indices.update(self.phonetic_index[query_phonetic_key])
+        # Keys are fixed width, so one vectorized compare over the (K, width) code-point matrix finds all neighbors
+        key_chars = keys.view(np.uint32).reshape(len(keys), -1)
+        query_chars = np.frombuffer(key.encode('utf-32-le'), dtype=np.uint32)
+        near = np.flatnonzero(np.count_nonzero(key_chars != query_chars, axis=1) == 1)
+        if len(near) == 0:
+            return self.phonetic_values[:0]
+        offsets = self.phonetic_offsets
+        return np.concatenate([self.phonetic_values[offsets[i]:offsets[i + 1]] for i in near])
+    
+    def _append_unique(self, result: np.ndarray, extra: np.ndarray) -> np.ndarray:
+        """result followed by the indices of extra not already in it."""
+        if len(extra) == 0:
+            return result
+        # Buckets hold unique indices, so a mask dedups the merge without hashing
+        seen = np.zeros(len(self.candidates), dtype=bool)
+        seen[result] = True
+        return np.concatenate((result, extra[~seen[extra]]))
+    
+    def get_shortlist(self, query_phonetic_key: str, query_first_letter: str) -> np.ndarray:
+        """Indices to score: phonetic bucket; if small add first-letter, then keys one char away up to MIN_SHORTLIST;
+        if empty full scan; cap at MAX_SHORTLIST."""
+        result = self._phonetic_bucket(query_phonetic_key)
         
-        if len(indices) < MIN_SHORTLIST:
-            if query_first_letter in self.first_letter_index:
-                indices.update(self.first_letter_index[query_first_letter])
+        if len(result) < MIN_SHORTLIST:
+            first_letter_bucket = self.first_letter_index.get(query_first_letter)
+            if first_letter_bucket:
+                result = self._append_unique(result, np.asarray(first_letter_bucket, dtype=np.int32))
         
-        if len(indices) == 0:
-            indices = set(range(len(self.candidates)))
+        if 0 < len(result) < MIN_SHORTLIST:
+            # Backfill only: neighbors catch a typo in the key's first letter (kavya/cavya) without pushing
+            # exact or first-letter candidates out or changing their order
+            neighbors = self._append_unique(result, self._neighbor_buckets(query_phonetic_key))
+            result = neighbors[:MIN_SHORTLIST]
         
-        result = list(indices)
-        if len(result) > MAX_SHORTLIST:
-            result = result[:MAX_SHORTLIST]
+        if len(result) == 0:
+            result = self.get_all_indices()
         
-        return result
+        return result[:MAX_SHORTLIST]
     
-    def get_all_indices(self) -> List[int]:
-        return list(range(len(self.candidates)))
+    def get_all_indices(self) -> np.ndarray:
+        return np.arange(len(self.candidates), dtype=np.int32)
     
     def __len__(self) -> int:
         return len(self.candidates)
 
 
+def _cache_path_for(csv_path: Path) -> Optional[Path]:
+    """Cache file for a CSV, keyed by resolved path, mtime and size."""
+    try:
+        stat = csv_path.stat()
+    except OSError:
+        return None
+    raw = f"{csv_path.resolve()}:{stat.st_mtime_ns}:{stat.st_size}:{INDEX_CACHE_VERSION}"
+    key = hashlib.blake2b(raw.encode('utf-8')).hexdigest()[:16]
+    return INDEX_CACHE_DIR / f"idx-{key}.pkl"
+
+
 _global_index: Optional[NameIndex] = None
 
 
@@ -3,30 +3,62 @@
 from typing import List, NamedTuple
 from dataclasses import dataclass
 
+from src.phonetic import phonetic_rewrite
 
-@dataclass
+
+@dataclass(slots=True)
 class ClassifiedTokens:
     """Classified tokens: core, initials, merged initials."""
     core_tokens: List[str]        # Full name parts (len > 1)
     initial_tokens: List[str]     # Single letter initials
     merged_initials: List[str]    # 2-letter possible initials (gs, bs)
     all_tokens: List[str]         # Original token list for reference
+    phonetic_cores: List[str]     # phonetic_rewrite of each core token
+    phonetic_core_joined: str     # Space-joined phonetic_cores (phonetic_core_string)
+    # Derived lists, built once in classify_tokens since candidates are scored against every query
+    remaining_core: List[str]     # core_tokens after the first
+    phonetic_remaining: List[str] # phonetic_cores after the first
+    all_initials_expanded: List[str]  # Initials plus expanded merged (gs -> g, s)
+    initials_mask: int            # letter_mask(all_initials_expanded)
+    remaining_first_mask: int     # letter_mask of the first letters of remaining_core
     
     @property
     def first_core(self) -> str:
         return self.core_tokens[0] if self.core_tokens else ""
     
     @property
-    def remaining_core(self) -> List[str]:
-        return self.core_tokens[1:] if len(self.core_tokens) > 1 else []
-    
-    @property
-    def all_initials_expanded(self) -> List[str]:
-        """Initials plus expanded merged (gs -> g, s)."""
-        result = list(self.initial_tokens)
-        for merged in self.merged_initials:
-            result.extend(expand_merged_initial(merged))
-        return result
+    def phonetic_first(self) -> str:
+        return self.phonetic_cores[0] if self.phonetic_cores else ""
+
+
+# Bits used by a-z; masks within this fit a uint32 and can be processed as numpy arrays
+ASCII_LETTER_MASK = (1 << 26) - 1
+
+
+def letter_bit(c: str) -> int:
+    """One bit per character: a-z -> bits 0-25 (small ints); anything else above them."""
+    code = ord(c) - 97
+    return 1 << code if 0 <= code < 26 else 1 << (26 + ord(c))
+
+
+def letter_mask(letters: List[str]) -> int:
+    """Bitmask of the first character of each string, so set algebra on letters is integer ops."""
+    mask = 0
+    for letter in letters:
+        if letter:
+            mask |= letter_bit(letter[0])
+    return mask
+
+
+def mask_letters(mask: int) -> List[str]:
+    """Letters set in a letter_mask, in bit order (a-z first)."""
+    letters = []
+    while mask:
+        low = mask & -mask
+        bit = low.bit_length() - 1
+        letters.append(chr(bit + 97) if bit < 26 else chr(bit - 26))
+        mask ^= low
+    return letters
 
 
 def is_core_token(token: str) -> bool:
@@ -69,11 +101,25 @@ def classify_tokens(tokens: List[str]) -> ClassifiedTokens:
             core.append(token)
         # Skip tokens that don't fit any category (rare edge cases)
     
+    # Rewritten once here so scoring never re-runs the phonetic rules per candidate pair
+    phonetic_cores = [phonetic_rewrite(t) for t in core]
+    
+    initials_expanded = list(initials)
+    for token in merged:
+        initials_expanded.extend(expand_merged_initial(token))
+    
     return ClassifiedTokens(
         core_tokens=core,
         initial_tokens=initials,
         merged_initials=merged,
-        all_tokens=tokens
+        all_tokens=tokens,
+        phonetic_cores=phonetic_cores,
+        phonetic_core_joined=' '.join(phonetic_cores),
+        remaining_core=core[1:],
+        phonetic_remaining=phonetic_cores[1:],
+        all_initials_expanded=initials_expanded,
+        initials_mask=letter_mask(initials_expanded),
+        remaining_first_mask=letter_mask(core[1:])
     )
 
 
@@ -1,31 +1,48 @@
 # Matcher: normalize query, get shortlist from index, score, sort, return top-k.
 
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+from functools import lru_cache
+from operator import attrgetter
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass, field
+
+import numpy as np
 
 from src.normalize import normalize_text, tokenize, is_valid_name
 from src.phonetic import phonetic_key_for_index, first_letter_key
-from src.initials import classify_tokens
+from src.initials import classify_tokens, ClassifiedTokens
 from src.index import NameIndex, Candidate
-from src.scoring import score_candidate, ScoreBreakdown
+from src.scoring import (
+    score_candidate, score_candidates_fast, compute_first_name_scores, compute_edit_distance_scores,
+    compute_phonetic_core_scores, compute_full_string_scores, ScoreBreakdown
+)
 
 
-@dataclass
+@dataclass(slots=True)
 class MatchResult:
     """One match: name, score, breakdown."""
     name: str
     score: float
     breakdown: ScoreBreakdown
+    # Ranking key, built once with the result (see NameMatcher.match for the priority order)
+    sort_key: tuple = field(default=(), repr=False, compare=False)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
             'name': self.name,
-            'score': round(self.score, 1),
+            'score': self.score,
             'breakdown': self.breakdown.to_dict()
         }
+    
+    def to_display_dict(self) -> Dict[str, Any]:
+        """Like to_dict, with scores rounded to 1 decimal for output."""
+        return {
+            'name': self.name,
+            'score': round(self.score, 1),
+            'breakdown': self.breakdown.to_display_dict()
+        }
 
 
-@dataclass
+@dataclass(slots=True)
 class MatcherResult:
     """Full result: query, best match, list of matches, optional error."""
     query: str
@@ -35,6 +52,13 @@ class MatcherResult:
     error: Optional[str] = None
     
     def to_dict(self) -> Dict[str, Any]:
+        return self._as_dict(MatchResult.to_dict)
+    
+    def to_display_dict(self) -> Dict[str, Any]:
+        """Output form (rounded scores); used by the CLI and JSON printing."""
+        return self._as_dict(MatchResult.to_display_dict)
+    
+    def _as_dict(self, match_to_dict) -> Dict[str, Any]:
         result = {
             'query': self.query,
             'query_normalized': self.query_normalized,
@@ -45,23 +69,77 @@ class MatcherResult:
             result['best_match'] = None
             result['matches'] = []
         else:
-            result['best_match'] = self.best_match.to_dict() if self.best_match else None
-            result['matches'] = [m.to_dict() for m in self.matches]
+            matches = [match_to_dict(m) for m in self.matches]
+            # best_match is normally matches[0]; share its dict instead of building it twice
+            if self.best_match is None:
+                result['best_match'] = None
+            elif self.matches and self.matches[0] is self.best_match:
+                result['best_match'] = matches[0]
+            else:
+                result['best_match'] = match_to_dict(self.best_match)
+            result['matches'] = matches
         
         return result
 
 
+_SORT_KEY = attrgetter('sort_key')
+
+
 class NameMatcher:
     """Takes an index; match(query, top_k) returns best matches and ranked list."""
     
     def __init__(self, index: NameIndex):
         self.index = index
+        # Per-matcher so the caches live and die with this matcher's index
+        self._prepare = lru_cache(maxsize=256)(self._prepare_query)
+        self._first_name_scores = lru_cache(maxsize=64)(self._compute_first_name_scores)
     
-    def match(self, query: str, top_k: int = 5) -> MatcherResult:
-        """Find top_k matches for query. Returns MatcherResult with best match and list."""
+    def _shortlist_for(self, first_core: str) -> np.ndarray:
+        """Phonetic-index shortlist for a query's first core token; full scan when it has none."""
+        if not first_core:
+            # Query with no core tokens (only initials): full scan with low confidence
+            return self.index.get_all_indices()
+        phonetic_key = phonetic_key_for_index(first_core)
+        first_letter = first_letter_key(first_core)
+        return self.index.get_shortlist(phonetic_key, first_letter)
+    
+    def _compute_first_name_scores(
+        self, first_core: str, phonetic_first: str, index_version: int
+    ) -> np.ndarray:
+        """First-name scores over the query's shortlist. Depends only on the first core, so queries that
+        differ in later tokens (typing "geetha b", "geetha b s") share one entry; index_version only keys the cache."""
+        shortlist = self._shortlist_for(first_core)
+        scores = compute_first_name_scores(
+            first_core,
+            phonetic_first,
+            self.index.first_core_arr[shortlist],
+            self.index.phonetic_first_arr[shortlist],
+            self.index.first_len_arr[shortlist],
+            self.index.phonetic_first_len_arr[shortlist]
+        )
+        # Shared by every hit on this entry
+        scores.flags.writeable = False
+        return scores
+    
+    def _prepare_query(self, query: str, index_version: int) -> Tuple[str, Optional[ClassifiedTokens], Optional[np.ndarray]]:
+        """Normalize, classify and shortlist a query. index_version only keys the cache."""
         query_normalized = normalize_text(query)
         
         if not is_valid_name(query_normalized):
+            return query_normalized, None, None
+        
+        # Tokenize and classify
+        query_tokens = tokenize(query_normalized)
+        query_classified = classify_tokens(query_tokens)
+        
+        return query_normalized, query_classified, self._shortlist_for(query_classified.first_core)
+    
+    def match(self, query: str, top_k: int = 5) -> MatcherResult:
+        """Find top_k matches for query. Returns MatcherResult with best match and list."""
+        # Repeated queries against an unchanged index skip straight to scoring
+        query_normalized, query_classified, shortlist = self._prepare(query, self.index.version)
+        
+        if query_classified is None:
             return MatcherResult(
                 query=query,
                 query_normalized=query_normalized,
@@ -70,41 +148,77 @@ class NameMatcher:
                 error="Invalid query: empty or no alphabetic characters"
             )
         
-        # Tokenize and classify
-        query_tokens = tokenize(query_normalized)
-        query_classified = classify_tokens(query_tokens)
+        # Single-string components for the whole shortlist in one batch each
+        shortlist_normalized = self.index.normalized_arr[shortlist]
+        first_name_scores = self._first_name_scores(
+            query_classified.first_core, query_classified.phonetic_first, self.index.version
+        )
+        edit_distance_scores = compute_edit_distance_scores(query_normalized, shortlist_normalized)
+        phonetic_core_scores = compute_phonetic_core_scores(
+            query_classified.phonetic_core_joined,
+            self.index.phonetic_core_arr[shortlist]
+        )
+        full_string_scores = compute_full_string_scores(query_normalized, shortlist_normalized)
+        
+        # Rank on final_score alone; breakdowns are only built for candidates that can make the cut
+        candidates = self.index.candidates
+        remaining_flat, phonetic_remaining_flat, remaining_counts = self.index.remaining_cores_for(shortlist)
+        scores = score_candidates_fast(
+            query_classified,
+            self.index.classified_arr[shortlist],
+            first_name_scores,
+            edit_distance_scores,
+            phonetic_core_scores,
+            full_string_scores,
+            self.index.core_count_arr[shortlist],
+            self.index.first_len_arr[shortlist],
+            self.index.initials_mask_arr[shortlist],
+            self.index.remaining_first_mask_arr[shortlist],
+            self.index.wide_mask_arr[shortlist],
+            remaining_flat,
+            phonetic_remaining_flat,
+            remaining_counts
+        )
         
-        # Handle edge case: query with no core tokens (only initials)
-        if not query_classified.core_tokens:
-            # Fall back to full scan with low confidence
-            shortlist = self.index.get_all_indices()
+        # Only results scoring at least the k-th best can make the cut; an O(n) partition finds that
+        # threshold, then the full tie-breaking sort runs on the survivors (ties at the cut are kept)
+        if 0 < top_k < len(scores):
+            kth_score = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+            survivors = np.flatnonzero(scores >= kth_score)
         else:
-            # Get shortlist from phonetic index
-            phonetic_key = phonetic_key_for_index(query_classified.first_core)
-            first_letter = first_letter_key(query_classified.first_core)
-            shortlist = self.index.get_shortlist(phonetic_key, first_letter)
+            survivors = np.arange(len(scores))
         
-        # Score each candidate in shortlist
         scored_results: List[MatchResult] = []
-        
-        for idx in shortlist:
-            candidate = self.index.candidates[idx]
+        for i in survivors.tolist():
+            candidate = candidates[shortlist[i]]
             
             breakdown = score_candidate(
                 query_normalized,
                 query_classified,
                 candidate.normalized,
-                candidate.classified
+                candidate.classified,
+                first_name_score=float(first_name_scores[i]),
+                edit_distance_score=float(edit_distance_scores[i]),
+                phonetic_core_score=float(phonetic_core_scores[i]),
+                full_string_score=float(full_string_scores[i])
             )
             
+            # Tie-breaking priority: higher final score, higher first_name_score,
+            # fewer missing initials, fewer missing core tokens; input order otherwise (stable sort)
             scored_results.append(MatchResult(
                 name=candidate.original,
                 score=breakdown.final_score,
-                breakdown=breakdown
+                breakdown=breakdown,
+                sort_key=(
+                    breakdown.final_score,
+                    breakdown.first_name_score,
+                    -len(breakdown.missing_initials),
+                    -breakdown.missing_core_penalty,
+                )
             ))
         
         # Sort with tie-breaking
-        scored_results.sort(key=lambda r: self._sort_key(r), reverse=True)
+        scored_results.sort(key=_SORT_KEY, reverse=True)
         
         # Get top_k
         top_matches = scored_results[:top_k]
@@ -116,27 +230,6 @@ class NameMatcher:
             best_match=best_match,
             matches=top_matches
         )
-    
-    def _sort_key(self, result: MatchResult) -> tuple:
-        """
-        Generate sort key for deterministic tie-breaking.
-        
-        Priority:
-        1. Higher final score
-        2. Higher first_name_score
-        3. Fewer missing initials
-        4. Fewer missing core tokens (approximated by query - candidate)
-        5. Lexicographic by name (for stability)
-        """
-        bd = result.breakdown
-        return (
-            result.score,
-            bd.first_name_score,
-            -len(bd.missing_initials),
-            -bd.missing_core_penalty,
-            # Negative for reverse lexicographic (so 'A' beats 'Z')
-            # Actually we want stable, so just use the name
-        )
 
 
 def match_names(
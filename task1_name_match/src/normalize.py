@@ -1,10 +1,10 @@
 # Text normalization for name matching. Punctuation -> spaces so "Vignesh.G.S" -> "vignesh g s" (keeps initials).
 
-import re
 from typing import List, Optional
 
 
-PUNCT_PATTERN = re.compile(r'[.,;:()\[\]{}\-_/\'"]+')
+# Punctuation -> space in one C-level pass; split/join then collapses runs and strips
+_PUNCT_MAP = str.maketrans({c: ' ' for c in '.,;:()[]{}-_/\'"'})
 
 
 def normalize_text(s: str) -> str:
@@ -12,12 +12,7 @@ def normalize_text(s: str) -> str:
     if not s:
         return ""
     
-    text = s.lower()
-    
-    text = PUNCT_PATTERN.sub(' ', text)
-    text = re.sub(r'\s+', ' ', text)
-    
-    return text.strip()
+    return ' '.join(s.lower().translate(_PUNCT_MAP).split())
 
 
 def tokenize(normalized: str) -> List[str]:
@@ -29,9 +24,8 @@ def tokenize(normalized: str) -> List[str]:
 
 def is_valid_name(normalized: str) -> bool:
     """True if non-empty and has at least one letter."""
-    if not normalized:
-        return False
-    return any(c.isalpha() for c in normalized)
+    # map(str.isalpha) stays in C; a [^\W\d_] regex would also accept numerics like "²", "¼", "Ⅻ"
+    return any(map(str.isalpha, normalized))
 
 
 def normalize_and_tokenize(raw: str) -> tuple[str, List[str]]:
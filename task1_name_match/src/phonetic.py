@@ -1,16 +1,21 @@
 # Phonetic rewrite for Indian name transliteration (Geetha/Gita, Pooja/Puja, etc.). Rules applied in order; longer patterns first.
 
+import re
+from functools import lru_cache
 from typing import List
 from src.config import PHONETIC_KEY_LENGTH
 
 
-PHONETIC_RULES = [
+VOWEL_AND_DIGRAPH_RULES = [
     ('ee', 'i'),
     ('aa', 'a'),
     ('oo', 'u'),
     ('th', 't'),
     ('ph', 'f'),
     ('sh', 's'),
+]
+
+DOUBLE_CONSONANT_RULES = [
     ('tt', 't'),
     ('nn', 'n'),
     ('kk', 'k'),
@@ -19,20 +24,36 @@ PHONETIC_RULES = [
     ('ll', 'l'),
 ]
 
+PHONETIC_RULES = VOWEL_AND_DIGRAPH_RULES + DOUBLE_CONSONANT_RULES
+
+# Both groups fused into one compiled pass. Groups start with different letters except t, and only th -> t can
+# feed the second group (mitthun -> mittun -> mitun), so a maximal run of t/th units (other than a lone t) is
+# matched as a whole and collapsed to what the two passes would give: units halved, rounded up.
+_PHONETIC_TABLE = dict(PHONETIC_RULES)
+_PHONETIC_PATTERN = re.compile(
+    '|'.join(re.escape(p) for p, _ in PHONETIC_RULES if p[0] != 't') + '|t(?:th?)+|th(?:th?)*'
+)
+
 
+def _phonetic_replace(match: 're.Match[str]') -> str:
+    text = match.group(0)
+    if text[0] == 't':
+        return 't' * ((text.count('t') + 1) // 2)
+    return _PHONETIC_TABLE[text]
+
+
+# Tokens repeat heavily (kumar, singh, raj) across index build and queries, so the pure helpers are memoized;
+# the rewrite cache is sized to hold every distinct token of a large index
+@lru_cache(maxsize=1 << 17)
 def phonetic_rewrite(token: str) -> str:
     """Apply phonetic rules to a token (length > 1). e.g. geetha -> gita."""
     if len(token) <= 1:
         return token
     
-    result = token.lower()
-    
-    for pattern, replacement in PHONETIC_RULES:
-        result = result.replace(pattern, replacement)
-    
-    return result
+    return _PHONETIC_PATTERN.sub(_phonetic_replace, token.lower())
 
 
+@lru_cache(maxsize=4096)
 def phonetic_key_for_index(first_core_token: str) -> str:
     """First N chars of phonetically rewritten first core token; padded if short. Used for index bucket."""
     if not first_core_token:
@@ -51,6 +72,7 @@ def phonetic_core_string(core_tokens: List[str]) -> str:
     return ' '.join(phonetic_rewrite(t) for t in core_tokens)
 
 
+@lru_cache(maxsize=4096)
 def first_letter_key(first_core_token: str) -> str:
     """First letter of first core token; used when phonetic bucket is empty or small."""
     if not first_core_token:
@@ -1,13 +1,15 @@
 # Multi-component scoring: first_name, edit_distance, other_core, initials, phonetic, full_string; minus penalties (missing/extra initials, missing cores, length).
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 
-from rapidfuzz import fuzz
+import numpy as np
+from rapidfuzz import fuzz, process
 from rapidfuzz.distance import Levenshtein
 
-from src.phonetic import phonetic_rewrite, phonetic_core_string
-from src.initials import ClassifiedTokens, get_first_letters_of_cores
+from src.initials import (
+    ClassifiedTokens, ASCII_LETTER_MASK, letter_bit, letter_mask, mask_letters
+)
 from src.config import (
     WEIGHT_FIRST_NAME, WEIGHT_OTHER_CORE, WEIGHT_INITIALS,
     WEIGHT_PHONETIC_CORE, WEIGHT_FULL_STRING, WEIGHT_EDIT_DISTANCE,
@@ -19,7 +21,24 @@ from src.config import (
 )
 
 
-@dataclass
+# Score fields rounded for display; ranking and to_dict keep the raw floats
+_DISPLAY_ROUNDED_FIELDS = (
+    'first_name_score', 'edit_distance_score', 'other_core_score', 'initials_score',
+    'phonetic_core_score', 'full_string_score', 'missing_initial_penalty', 'extra_initial_penalty',
+    'missing_core_penalty', 'overlong_penalty', 'length_diff_penalty', 'final_score',
+)
+
+
+# Set-bit count of every 16-bit value (np.bitwise_count needs NumPy 2.0; requirements allow 1.24)
+_POPCOUNT_16 = np.array([bin(i).count('1') for i in range(1 << 16)], dtype=np.uint8)
+
+
+def _popcount(masks: np.ndarray) -> np.ndarray:
+    """Set bits per element of a uint32 mask array, via two 16-bit table lookups."""
+    return _POPCOUNT_16[masks & 0xFFFF] + _POPCOUNT_16[masks >> 16]
+
+
+@dataclass(slots=True)
 class ScoreBreakdown:
     """All score components and penalties for one candidate."""
     first_name_score: float
@@ -48,20 +67,20 @@ class ScoreBreakdown:
     extra_initials: List[str]
     
     def to_dict(self) -> Dict[str, Any]:
-        """Dict for JSON."""
+        """Dict with raw float scores (no rounding)."""
         return {
-            'first_name_score': round(self.first_name_score, 1),
-            'edit_distance_score': round(self.edit_distance_score, 1),
-            'other_core_score': round(self.other_core_score, 1),
-            'initials_score': round(self.initials_score, 1),
-            'phonetic_core_score': round(self.phonetic_core_score, 1),
-            'full_string_score': round(self.full_string_score, 1),
-            'missing_initial_penalty': round(self.missing_initial_penalty, 1),
-            'extra_initial_penalty': round(self.extra_initial_penalty, 1),
-            'missing_core_penalty': round(self.missing_core_penalty, 1),
-            'overlong_penalty': round(self.overlong_penalty, 1),
-            'length_diff_penalty': round(self.length_diff_penalty, 1),
-            'final_score': round(self.final_score, 1),
+            'first_name_score': self.first_name_score,
+            'edit_distance_score': self.edit_distance_score,
+            'other_core_score': self.other_core_score,
+            'initials_score': self.initials_score,
+            'phonetic_core_score': self.phonetic_core_score,
+            'full_string_score': self.full_string_score,
+            'missing_initial_penalty': self.missing_initial_penalty,
+            'extra_initial_penalty': self.extra_initial_penalty,
+            'missing_core_penalty': self.missing_core_penalty,
+            'overlong_penalty': self.overlong_penalty,
+            'length_diff_penalty': self.length_diff_penalty,
+            'final_score': self.final_score,
             'query_cores': self.query_cores,
             'candidate_cores': self.candidate_cores,
             'query_initials': self.query_initials,
@@ -69,31 +88,90 @@ class ScoreBreakdown:
             'missing_initials': self.missing_initials,
             'extra_initials': self.extra_initials,
         }
+    
+    def to_display_dict(self) -> Dict[str, Any]:
+        """Dict for JSON/CLI output; scores rounded to 1 decimal."""
+        result = self.to_dict()
+        for key in _DISPLAY_ROUNDED_FIELDS:
+            result[key] = round(result[key], 1)
+        return result
 
 
-def compute_first_name_score(q_first: str, c_first: str) -> float:
-    """First-name match: raw WRatio + phonetic WRatio blend."""
+def compute_first_name_score(q_first: str, c_first: str, q_phonetic_first: str, c_phonetic_first: str) -> float:
+    """First-name match: raw WRatio + phonetic WRatio blend (phonetic forms precomputed)."""
     if not q_first or not c_first:
         return 0.0
     
     raw_score = fuzz.WRatio(q_first, c_first)
     
     # Phonetic similarity (handles transliteration variants)
-    phonetic_score = fuzz.WRatio(
-        phonetic_rewrite(q_first),
-        phonetic_rewrite(c_first)
-    )
+    phonetic_score = fuzz.WRatio(q_phonetic_first, c_phonetic_first)
     
     # Combine: favor raw match but boost phonetic matches
     return 0.7 * raw_score + 0.3 * phonetic_score
 
 
+# WRatio's partial scale at a length ratio of exactly 8 differs across rapidfuzz releases (< 8 vs <= 8); probe it once
+_PARTIAL_SCALE_AT_8 = fuzz.WRatio('a', 'a' * 8) / fuzz.partial_ratio('a', 'a' * 8)
+
+
+def single_token_wratio_scores(q: str, choices: np.ndarray, c_lens: np.ndarray) -> np.ndarray:
+    """fuzz.WRatio(q, c) for every c, valid only when q and all choices are single tokens (no whitespace).
+    
+    With one token per side WRatio's token scorers never beat ratio / partial_ratio, so it reduces to
+    ratio below a 1.5 length ratio and max(ratio, partial_ratio * scale) above; partial_ratio only runs there.
+    """
+    scores = process.cdist([q], choices, scorer=fuzz.ratio, dtype=np.float64)[0]
+    
+    longer = np.maximum(len(q), c_lens)
+    shorter = np.minimum(len(q), c_lens)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        len_ratio = longer / shorter
+    partial = np.flatnonzero((len_ratio >= 1.5) & (shorter > 0))
+    if len(partial):
+        ratios = len_ratio[partial]
+        scale = np.where(ratios < 8.0, 0.9, np.where(ratios == 8.0, _PARTIAL_SCALE_AT_8, 0.6))
+        partial_scores = process.cdist([q], choices[partial], scorer=fuzz.partial_ratio, dtype=np.float64)[0]
+        scores[partial] = np.maximum(scores[partial], partial_scores * scale)
+    
+    # WRatio scores 0 against an empty string
+    scores[shorter == 0] = 0.0
+    return scores
+
+
+def compute_first_name_scores(
+    q_first: str,
+    q_phonetic_first: str,
+    c_firsts: np.ndarray,
+    c_phonetic_firsts: np.ndarray,
+    c_first_lens: np.ndarray,
+    c_phonetic_first_lens: np.ndarray
+) -> np.ndarray:
+    """compute_first_name_score for one query against many candidates (first cores are single tokens)."""
+    if not q_first or len(c_firsts) == 0:
+        return np.zeros(len(c_firsts), dtype=np.float64)
+    
+    raw_scores = single_token_wratio_scores(q_first, c_firsts, c_first_lens)
+    phonetic_scores = single_token_wratio_scores(q_phonetic_first, c_phonetic_firsts, c_phonetic_first_lens)
+    
+    return 0.7 * raw_scores + 0.3 * phonetic_scores
+
+
+def compute_core_similarity(a: str, b: str) -> float:
+    """Similarity of two single-word cores (0-100): normalized Levenshtein, 0 below half similar."""
+    # A single word has no token order or subsets for WRatio's extra sub-scorers to find
+    return Levenshtein.normalized_similarity(a, b, score_cutoff=0.5) * 100
+
+
 def compute_other_core_score(
     q_remaining: List[str],
     c_remaining: List[str],
-    c_initials: List[str]
+    c_initials_mask: int,
+    q_phonetic_remaining: List[str],
+    c_phonetic_remaining: List[str]
 ) -> float:
-    """Match non-first cores; best match per query core; K can match Kumar."""
+    """Match non-first cores; best match per query core; K can match Kumar (bit test on the candidate's initials mask).
+    Phonetic lists parallel the core lists; tokens are already lowercase from normalize_text."""
     if not q_remaining:
         return 50.0
     
@@ -101,89 +179,175 @@ def compute_other_core_score(
         # partial match if query cores' first letters appear in candidate initials
         matches = 0
         for q_core in q_remaining:
-            first_letter = q_core[0].lower()
-            if first_letter in c_initials:
+            if c_initials_mask & letter_bit(q_core[0]):
                 matches += 1
         if matches > 0:
             return ABBREV_MATCH_CAP * (matches / len(q_remaining))
         return 0.0
     
-    # Match each query core to best candidate core
-    scores = []
-    c_first_letters = get_first_letters_of_cores(c_remaining)
+    # Match each query core to best candidate core; running total instead of a per-call list
+    total = 0.0
     
-    for q_core in q_remaining:
+    for q_core, q_phonetic in zip(q_remaining, q_phonetic_remaining):
         # Find best matching candidate core
         best_score = 0.0
-        for c_core in c_remaining:
-            score = fuzz.WRatio(q_core, c_core)
+        for c_core, c_phonetic in zip(c_remaining, c_phonetic_remaining):
+            score = compute_core_similarity(q_core, c_core)
             # Also try phonetic
-            phon_score = fuzz.WRatio(
-                phonetic_rewrite(q_core),
-                phonetic_rewrite(c_core)
-            )
-            best_score = max(best_score, score, phon_score)
+            phon_score = compute_core_similarity(q_phonetic, c_phonetic)
+            # Conditional expressions instead of a max() call: no builtin dispatch or argument tuple per pair
+            best_score = best_score if best_score >= score else score
+            best_score = best_score if best_score >= phon_score else phon_score
         
         # Abbreviation fallback: if query core is short, check initials
-        q_first_letter = q_core[0].lower()
-        if best_score < ABBREV_MATCH_CAP and q_first_letter in c_initials:
+        if best_score < ABBREV_MATCH_CAP and c_initials_mask & letter_bit(q_core[0]):
             best_score = max(best_score, ABBREV_MATCH_CAP)
         
-        scores.append(best_score)
+        total += best_score
     
-    return sum(scores) / len(scores) if scores else 0.0
+    # q_remaining is non-empty here; same left-to-right sum as sum(scores)
+    return total / len(q_remaining)
 
 
-def compute_initials_score(
+def compute_other_core_scores(
+    q_remaining: List[str],
+    q_phonetic_remaining: List[str],
+    c_cores_flat: np.ndarray,
+    c_phonetic_flat: np.ndarray,
+    c_core_counts: np.ndarray,
+    c_initials_masks: np.ndarray
+) -> np.ndarray:
+    """compute_other_core_score for many candidates whose remaining cores are flattened (per-candidate counts).
+    
+    Query core first letters and candidate initials must be a-z (uint32 letter masks); callers take the scalar path otherwise.
+    """
+    n = len(c_core_counts)
+    if not q_remaining:
+        return np.full(n, 50.0)
+    
+    # Query core's first letter among candidate initials (abbreviation: K matches Kumar)
+    letter_in_initials = [(c_initials_masks & np.uint32(letter_bit(q[0]))) != 0 for q in q_remaining]
+    scores = np.empty(n, dtype=np.float64)
+    
+    # Candidates without remaining cores: partial credit per query core found among their initials
+    bare = c_core_counts == 0
+    matches = np.zeros(int(bare.sum()), dtype=np.int64)
+    for found in letter_in_initials:
+        matches += found[bare]
+    scores[bare] = np.where(matches > 0, ABBREV_MATCH_CAP * (matches / len(q_remaining)), 0.0)
+    
+    has_cores = ~bare
+    if not has_cores.any():
+        return scores
+    
+    # Every query core against every flattened candidate core (raw and phonetic) in two cdist calls,
+    # then the best per candidate segment with one reduceat
+    raw = process.cdist(
+        q_remaining, c_cores_flat, scorer=Levenshtein.normalized_similarity, score_cutoff=0.5, dtype=np.float64
+    ) * 100
+    phon = process.cdist(
+        q_phonetic_remaining, c_phonetic_flat, scorer=Levenshtein.normalized_similarity, score_cutoff=0.5, dtype=np.float64
+    ) * 100
+    counts = c_core_counts[has_cores]
+    best = np.maximum.reduceat(np.maximum(raw, phon), np.cumsum(counts) - counts, axis=1)
+    
+    # Same per-core abbreviation fallback and left-to-right total as the scalar loop
+    total = np.zeros(len(counts), dtype=np.float64)
+    for row, found in zip(best, letter_in_initials):
+        total = total + np.where((row < ABBREV_MATCH_CAP) & found[has_cores], ABBREV_MATCH_CAP, row)
+    scores[has_cores] = total / len(q_remaining)
+    
+    return scores
+
+
+def compute_initials_terms(
     q_initials: List[str],
-    c_initials: List[str],
-    c_remaining_cores: List[str]
-) -> tuple[float, List[str], List[str]]:
-    """Initials match score; returns (score, missing_initials, extra_initials)."""
+    q_mask: int,
+    c_mask: int,
+    c_core_first_mask: int
+) -> tuple[float, int, int]:
+    """Initials match score from letter masks (initials.letter_mask); returns (score, missing_mask, extra_mask)."""
     if not q_initials:
-        return 70.0, [], []
-    
-    q_set = set(i.lower() for i in q_initials)
-    c_set = set(i.lower() for i in c_initials)
-    
-    # First letters of candidate's remaining cores (for abbreviation matching)
-    c_core_first_letters = set(
-        core[0].lower() for core in c_remaining_cores if core
-    )
+        return 70.0, 0, 0
     
     # Find exact matches
-    exact_matches = q_set & c_set
+    exact_matches = q_mask & c_mask
     
     # Find missing initials (in query but not candidate)
-    missing = q_set - c_set
+    missing = q_mask & ~c_mask
     
     # Check if missing initials match any candidate core first letters
     # This is abbreviation logic: "K" matches "Kumar"
-    abbrev_matches = missing & c_core_first_letters
-    partial_matches = len(abbrev_matches)
-    truly_missing = list(missing - abbrev_matches)
+    abbrev_matches = missing & c_core_first_mask
+    partial_matches = abbrev_matches.bit_count()
+    truly_missing = missing & ~abbrev_matches
     
     # Extra initials (in candidate but not query)
-    extra = list(c_set - q_set)
+    extra = c_mask & ~q_mask
     
     # Calculate score
-    total_matches = len(exact_matches) + (partial_matches * 0.7)  # Partial credit
+    total_matches = exact_matches.bit_count() + (partial_matches * 0.7)  # Partial credit
     base_score = 100 * (total_matches / len(q_initials))
     
     return base_score, truly_missing, extra
 
 
-def compute_phonetic_core_score(q_cores: List[str], c_cores: List[str]) -> float:
-    """WRatio on phonetically normalized full core strings (e.g. geetha vs gita)."""
-    q_phonetic = phonetic_core_string(q_cores)
-    c_phonetic = phonetic_core_string(c_cores)
+def compute_initials_terms_batch(
+    q_initials: List[str],
+    q_mask: int,
+    c_masks: np.ndarray,
+    c_core_first_masks: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """compute_initials_terms over uint32 mask arrays (a-z masks only); returns (scores, missing_counts, extra_counts)."""
+    n = len(c_masks)
+    if not q_initials:
+        return np.full(n, 70.0), np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64)
+    
+    q_mask = np.uint32(q_mask)
+    exact_matches = _popcount(q_mask & c_masks)
+    missing = q_mask & ~c_masks
+    abbrev_matches = missing & c_core_first_masks
+    truly_missing = missing & ~abbrev_matches
+    extra = c_masks & ~q_mask
+    
+    total_matches = exact_matches + (_popcount(abbrev_matches) * 0.7)  # Partial credit
+    base_scores = 100 * (total_matches / len(q_initials))
     
+    return base_scores, _popcount(truly_missing).astype(np.int64), _popcount(extra).astype(np.int64)
+
+
+def compute_initials_score(
+    q_initials: List[str],
+    q_mask: int,
+    c_mask: int,
+    c_core_first_mask: int
+) -> tuple[float, List[str], List[str]]:
+    """compute_initials_terms with the masks decoded; returns (score, missing_initials, extra_initials)."""
+    base_score, truly_missing, extra = compute_initials_terms(q_initials, q_mask, c_mask, c_core_first_mask)
+    return (
+        base_score,
+        mask_letters(truly_missing) if truly_missing else [],
+        mask_letters(extra) if extra else []
+    )
+
+
+def compute_phonetic_core_score(q_phonetic: str, c_phonetic: str) -> float:
+    """WRatio on phonetically normalized full core strings (e.g. geetha vs gita), as phonetic_core_string gives."""
     if not q_phonetic or not c_phonetic:
         return 0.0
     
     return fuzz.WRatio(q_phonetic, c_phonetic)
 
 
+def compute_phonetic_core_scores(q_phonetic: str, c_phonetic_cores: np.ndarray) -> np.ndarray:
+    """compute_phonetic_core_score for one query against many candidates' phonetic core strings."""
+    if not q_phonetic or len(c_phonetic_cores) == 0:
+        return np.zeros(len(c_phonetic_cores), dtype=np.float64)
+    
+    # WRatio scores 0 against an empty candidate string, matching the scalar guard
+    return process.cdist([q_phonetic], c_phonetic_cores, scorer=fuzz.WRatio, dtype=np.float64)[0]
+
+
 def compute_full_string_score(q_normalized: str, c_normalized: str) -> float:
     """Overall string similarity (WRatio)."""
     if not q_normalized or not c_normalized:
@@ -192,6 +356,14 @@ def compute_full_string_score(q_normalized: str, c_normalized: str) -> float:
     return fuzz.WRatio(q_normalized, c_normalized)
 
 
+def compute_full_string_scores(q_normalized: str, c_normalized: np.ndarray) -> np.ndarray:
+    """compute_full_string_score for one query against many candidates (one native cdist call)."""
+    if not q_normalized or len(c_normalized) == 0:
+        return np.zeros(len(c_normalized), dtype=np.float64)
+    
+    return process.cdist([q_normalized], c_normalized, scorer=fuzz.WRatio, dtype=np.float64)[0]
+
+
 def compute_edit_distance_score(q_str: str, c_str: str) -> float:
     """Levenshtein-based score: 0 distance = 100, scaled by max length."""
     if not q_str or not c_str:
@@ -204,35 +376,40 @@ def compute_edit_distance_score(q_str: str, c_str: str) -> float:
     return 100 * (1 - distance / max_len)
 
 
-def score_candidate(
-    q_normalized: str,
+def compute_edit_distance_scores(q_str: str, c_strs: np.ndarray) -> np.ndarray:
+    """compute_edit_distance_score for one query against many candidates (one native cdist call)."""
+    if not q_str or len(c_strs) == 0:
+        return np.zeros(len(c_strs), dtype=np.float64)
+    
+    # normalized_similarity is 1 - distance / max_len, the scalar formula, 0 against an empty candidate;
+    # cdist preprocesses the query once (bit-parallel pattern) and reuses it for every candidate
+    similarities = process.cdist([q_str], c_strs, scorer=Levenshtein.normalized_similarity, dtype=np.float64)[0]
+    return 100 * similarities
+
+
+def _combine_scores(
     q_classified: ClassifiedTokens,
-    c_normalized: str,
-    c_classified: ClassifiedTokens
-) -> ScoreBreakdown:
-    """Full score breakdown for one query vs one candidate."""
-    # Extract components
+    c_classified: ClassifiedTokens,
+    first_name_score: float,
+    edit_distance_score: float,
+    other_core_score: float,
+    initials_score: float,
+    phonetic_core_score: float,
+    full_string_score: float,
+    missing_initial_count: int,
+    extra_initial_count: int
+) -> tuple[float, float, float, float, float, float, float]:
+    """Penalties and weighted final score from the component scores.
+    
+    Returns (initials_score, missing_initial_penalty, extra_initial_penalty,
+    missing_core_penalty, overlong_penalty, length_diff_penalty, final_score);
+    initials_score may be raised when the first name is strong.
+    """
     q_first = q_classified.first_core
     c_first = c_classified.first_core
-    q_remaining = q_classified.remaining_core
-    c_remaining = c_classified.remaining_core
-    q_initials = q_classified.all_initials_expanded
-    c_initials = c_classified.all_initials_expanded
-    
-    # Compute component scores
-    first_name_score = compute_first_name_score(q_first, c_first)
-    edit_distance_score = compute_edit_distance_score(q_normalized, c_normalized)
-    other_core_score = compute_other_core_score(q_remaining, c_remaining, c_initials)
-    initials_score, missing_initials, extra_initials = compute_initials_score(
-        q_initials, c_initials, c_remaining
-    )
-    phonetic_core_score = compute_phonetic_core_score(
-        q_classified.core_tokens, c_classified.core_tokens
-    )
-    full_string_score = compute_full_string_score(q_normalized, c_normalized)
     
     # Compute penalties
-    missing_initial_penalty = PENALTY_MISSING_INITIAL * len(missing_initials)
+    missing_initial_penalty = PENALTY_MISSING_INITIAL * missing_initial_count
     # When first name is strong but not exact (e.g. Ganu-Ganesh ~74), soften initial penalties so close first names can outrank initials-only matches.
     # Do not soften when first name is exact (100) so that e.g. "Vignesh Kumar" is still penalized for missing R vs "Vignesh Kumar R".
     first_name_strong_not_exact = (
@@ -240,13 +417,13 @@ def score_candidate(
     )
     if first_name_strong_not_exact:
         missing_initial_penalty = min(missing_initial_penalty, MISSING_INITIAL_PENALTY_CAP_WHEN_STRONG)
-        if missing_initials:
+        if missing_initial_count:
             initials_score = max(initials_score, 100.0)  # treat initials as satisfied when first name is strong (typo/variant)
             missing_initial_penalty = 0.0
     
     # Extra initial penalty only if query has initials
-    if q_initials:
-        extra_initial_penalty = PENALTY_EXTRA_INITIAL * len(extra_initials)
+    if q_classified.all_initials_expanded:
+        extra_initial_penalty = PENALTY_EXTRA_INITIAL * extra_initial_count
     else:
         extra_initial_penalty = 0.0
     if first_name_strong_not_exact:
@@ -288,6 +465,181 @@ def score_candidate(
     # Clamp to [0, 100]
     final_score = max(0.0, min(100.0, final_score))
     
+    return (
+        initials_score, missing_initial_penalty, extra_initial_penalty,
+        missing_core_penalty, overlong_penalty, length_diff_penalty, final_score
+    )
+
+
+def combine_scores_batch(
+    q_classified: ClassifiedTokens,
+    first_name_scores: np.ndarray,
+    edit_distance_scores: np.ndarray,
+    other_core_scores: np.ndarray,
+    initials_scores: np.ndarray,
+    phonetic_core_scores: np.ndarray,
+    full_string_scores: np.ndarray,
+    missing_initial_counts: np.ndarray,
+    extra_initial_counts: np.ndarray,
+    c_core_counts: np.ndarray,
+    c_first_lens: np.ndarray
+) -> np.ndarray:
+    """_combine_scores over arrays of candidates: final scores only, same float64 operation order."""
+    strong = (FIRST_NAME_STRONG_THRESHOLD <= first_name_scores) & (first_name_scores < 99.0)
+    strong_missing = strong & (missing_initial_counts > 0)
+    
+    missing_initial_penalty = PENALTY_MISSING_INITIAL * missing_initial_counts
+    missing_initial_penalty = np.where(
+        strong, np.minimum(missing_initial_penalty, MISSING_INITIAL_PENALTY_CAP_WHEN_STRONG), missing_initial_penalty
+    )
+    missing_initial_penalty = np.where(strong_missing, 0.0, missing_initial_penalty)
+    initials_scores = np.where(strong_missing, np.maximum(initials_scores, 100.0), initials_scores)
+    
+    if q_classified.all_initials_expanded:
+        extra_initial_penalty = PENALTY_EXTRA_INITIAL * extra_initial_counts
+    else:
+        extra_initial_penalty = np.zeros(len(first_name_scores), dtype=np.float64)
+    extra_initial_penalty = np.where(
+        strong, np.minimum(extra_initial_penalty, EXTRA_INITIAL_PENALTY_CAP_WHEN_STRONG), extra_initial_penalty
+    )
+    
+    q_core_count = len(q_classified.core_tokens)
+    missing_core_penalty = PENALTY_MISSING_CORE * np.maximum(0, q_core_count - c_core_counts)
+    overlong_penalty = PENALTY_OVERLONG_CANDIDATE * np.maximum(0, c_core_counts - q_core_count - 1)
+    
+    length_diff_penalty = PENALTY_LENGTH_DIFF * np.abs(len(q_classified.first_core) - c_first_lens)
+    length_diff_penalty = np.where(
+        strong, np.minimum(length_diff_penalty, LENGTH_DIFF_PENALTY_CAP_WHEN_STRONG), length_diff_penalty
+    )
+    
+    weighted_score = (
+        WEIGHT_FIRST_NAME * first_name_scores +
+        WEIGHT_EDIT_DISTANCE * edit_distance_scores +
+        WEIGHT_OTHER_CORE * other_core_scores +
+        WEIGHT_INITIALS * initials_scores +
+        WEIGHT_PHONETIC_CORE * phonetic_core_scores +
+        WEIGHT_FULL_STRING * full_string_scores
+    )
+    
+    final_scores = weighted_score - missing_initial_penalty - extra_initial_penalty
+    final_scores = final_scores - missing_core_penalty - overlong_penalty - length_diff_penalty
+    
+    return np.maximum(0.0, np.minimum(100.0, final_scores))
+
+
+def score_candidates_fast(
+    q_classified: ClassifiedTokens,
+    c_classified: np.ndarray,
+    first_name_scores: np.ndarray,
+    edit_distance_scores: np.ndarray,
+    phonetic_core_scores: np.ndarray,
+    full_string_scores: np.ndarray,
+    c_core_counts: np.ndarray,
+    c_first_lens: np.ndarray,
+    c_initials_masks: np.ndarray,
+    c_remaining_first_masks: np.ndarray,
+    c_wide_masks: np.ndarray,
+    c_remaining_flat: np.ndarray,
+    c_phonetic_remaining_flat: np.ndarray,
+    c_remaining_counts: np.ndarray
+) -> np.ndarray:
+    """final_score for many candidates, for ranking: same results as score_candidate without building breakdowns."""
+    n = len(c_classified)
+    q_remaining = q_classified.remaining_core
+    q_phonetic_remaining = q_classified.phonetic_remaining
+    q_initials = q_classified.all_initials_expanded
+    q_mask = q_classified.initials_mask
+    q_narrow = q_mask <= ASCII_LETTER_MASK and letter_mask(q_remaining) <= ASCII_LETTER_MASK
+    
+    # Letters beyond a-z (query or candidate) don't fit the uint32 masks: those go through the scalar path
+    if q_narrow:
+        # Other cores and initials as flattened-core / uint32 passes over the whole shortlist
+        other_core_scores = compute_other_core_scores(
+            q_remaining, q_phonetic_remaining,
+            c_remaining_flat, c_phonetic_remaining_flat, c_remaining_counts, c_initials_masks
+        )
+        initials_scores, missing_initial_counts, extra_initial_counts = compute_initials_terms_batch(
+            q_initials, q_mask, c_initials_masks, c_remaining_first_masks
+        )
+        wide = np.flatnonzero(c_wide_masks)
+    else:
+        other_core_scores = np.empty(n, dtype=np.float64)
+        initials_scores = np.empty(n, dtype=np.float64)
+        missing_initial_counts = np.empty(n, dtype=np.int64)
+        extra_initial_counts = np.empty(n, dtype=np.int64)
+        wide = np.arange(n)
+    
+    for i in wide.tolist():
+        c = c_classified[i]
+        other_core_scores[i] = compute_other_core_score(
+            q_remaining, c.remaining_core, c.initials_mask,
+            q_phonetic_remaining, c.phonetic_remaining
+        )
+        initials_score, missing_mask, extra_mask = compute_initials_terms(
+            q_initials, q_mask, c.initials_mask, c.remaining_first_mask
+        )
+        initials_scores[i] = initials_score
+        missing_initial_counts[i] = missing_mask.bit_count()
+        extra_initial_counts[i] = extra_mask.bit_count()
+    
+    return combine_scores_batch(
+        q_classified,
+        first_name_scores, edit_distance_scores, other_core_scores, initials_scores,
+        phonetic_core_scores, full_string_scores,
+        missing_initial_counts, extra_initial_counts, c_core_counts, c_first_lens
+    )
+
+
+def score_candidate(
+    q_normalized: str,
+    q_classified: ClassifiedTokens,
+    c_normalized: str,
+    c_classified: ClassifiedTokens,
+    first_name_score: Optional[float] = None,
+    edit_distance_score: Optional[float] = None,
+    phonetic_core_score: Optional[float] = None,
+    full_string_score: Optional[float] = None
+) -> ScoreBreakdown:
+    """Full score breakdown for one query vs one candidate. Single-string components may be precomputed (batched)."""
+    # Extract components
+    q_first = q_classified.first_core
+    c_first = c_classified.first_core
+    q_remaining = q_classified.remaining_core
+    c_remaining = c_classified.remaining_core
+    q_initials = q_classified.all_initials_expanded
+    c_initials = c_classified.all_initials_expanded
+    
+    # Compute component scores
+    if first_name_score is None:
+        first_name_score = compute_first_name_score(
+            q_first, c_first, q_classified.phonetic_first, c_classified.phonetic_first
+        )
+    if edit_distance_score is None:
+        edit_distance_score = compute_edit_distance_score(q_normalized, c_normalized)
+    other_core_score = compute_other_core_score(
+        q_remaining, c_remaining, c_classified.initials_mask,
+        q_classified.phonetic_remaining, c_classified.phonetic_remaining
+    )
+    initials_score, missing_initials, extra_initials = compute_initials_score(
+        q_initials, q_classified.initials_mask, c_classified.initials_mask, c_classified.remaining_first_mask
+    )
+    if phonetic_core_score is None:
+        phonetic_core_score = compute_phonetic_core_score(
+            q_classified.phonetic_core_joined, c_classified.phonetic_core_joined
+        )
+    if full_string_score is None:
+        full_string_score = compute_full_string_score(q_normalized, c_normalized)
+    
+    (
+        initials_score, missing_initial_penalty, extra_initial_penalty,
+        missing_core_penalty, overlong_penalty, length_diff_penalty, final_score
+    ) = _combine_scores(
+        q_classified, c_classified,
+        first_name_score, edit_distance_score, other_core_score, initials_score,
+        phonetic_core_score, full_string_score,
+        len(missing_initials), len(extra_initials)
+    )
+    
     return ScoreBreakdown(
         first_name_score=first_name_score,
         edit_distance_score=edit_distance_score,
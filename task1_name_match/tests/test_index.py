@@ -0,0 +1,102 @@
+"""NameIndex loading and on-disk cache."""
+
+import pytest
+from src import index as index_module
+from src.index import NameIndex
+
+
+@pytest.fixture
+def csv_file(tmp_path, monkeypatch):
+    """Small names CSV with the cache redirected into tmp_path."""
+    monkeypatch.setattr(index_module, "INDEX_CACHE_DIR", tmp_path / "cache")
+    path = tmp_path / "names.csv"
+    path.write_text("name\nGeetha B S\nVignesh G.S\nKrishna R\nGeetha B S\n", encoding="utf-8")
+    return path
+
+
+class TestLoadFromCsv:
+    """CSV parsing: name column located from the header."""
+    
+    def test_name_column_any_position_and_case(self, tmp_path):
+        path = tmp_path / "names.csv"
+        path.write_text(",Name\n0,Gita\n1,Geetha B.S\n2,\n", encoding="utf-8")
+        
+        idx = NameIndex()
+        assert idx.load_from_csv(str(path), use_cache=False) == 2
+        assert [c.original for c in idx.candidates] == ["Gita", "Geetha B.S"]
+    
+    def test_missing_name_column_loads_nothing(self, tmp_path):
+        path = tmp_path / "people.csv"
+        path.write_text("id,surname\n1,Rao\n", encoding="utf-8")
+        
+        assert NameIndex().load_from_csv(str(path), use_cache=False) == 0
+    
+    def test_dedup_across_loads(self, csv_file):
+        idx = NameIndex()
+        assert idx.load_from_csv(str(csv_file), use_cache=False) == 3
+        assert idx.load_from_list(["Krishna R", "Gita"]) == 4
+
+
+class TestIndexCache:
+    """Pickle cache keyed by CSV path/mtime/size."""
+    
+    def test_cache_written_and_reused(self, csv_file, tmp_path):
+        first = NameIndex()
+        assert first.load_from_csv(str(csv_file)) == 3
+        assert len(list((tmp_path / "cache").glob("idx-*.pkl"))) == 1
+        
+        second = NameIndex()
+        assert second.load_from_csv(str(csv_file)) == 3
+        assert [c.normalized for c in second.candidates] == [c.normalized for c in first.candidates]
+        assert list(second.get_shortlist("git", "g")) == list(first.get_shortlist("git", "g"))
+    
+    def test_changed_csv_rebuilds(self, csv_file):
+        NameIndex().load_from_csv(str(csv_file))
+        csv_file.write_text("name\nGeetha B S\nGita\n", encoding="utf-8")
+        
+        idx = NameIndex()
+        assert idx.load_from_csv(str(csv_file)) == 2
+        assert [c.original for c in idx.candidates] == ["Geetha B S", "Gita"]
+    
+    def test_use_cache_false_skips_cache(self, csv_file, tmp_path):
+        NameIndex().load_from_csv(str(csv_file), use_cache=False)
+        assert not (tmp_path / "cache").exists()
+    
+    def test_corrupt_cache_ignored(self, csv_file, tmp_path):
+        NameIndex().load_from_csv(str(csv_file))
+        for cached in (tmp_path / "cache").glob("idx-*.pkl"):
+            cached.write_bytes(b"not a pickle")
+        
+        assert NameIndex().load_from_csv(str(csv_file)) == 3
+
+
+class TestShortlist:
+    """Phonetic blocking and its fallbacks."""
+    
+    def test_small_bucket_adds_one_char_neighbors(self):
+        idx = NameIndex()
+        idx.load_from_list(["Kavya", "Cavya", "Kavitha", "Ravi"])
+        
+        # "cav" and "rav" each differ from "kav" in one position; exact bucket comes first
+        shortlist = [idx.candidates[i].original for i in idx.get_shortlist("kav", "k")]
+        assert shortlist[:2] == ["Kavya", "Kavitha"]
+        assert set(shortlist) == {"Kavya", "Kavitha", "Cavya", "Ravi"}
+    
+    def test_empty_bucket_falls_back_to_full_scan(self):
+        idx = NameIndex()
+        idx.load_from_list(["Gita", "Ravi"])
+        assert list(idx.get_shortlist("zzz", "z")) == [0, 1]
+    
+    def test_neighbors_backfill_after_first_letter(self):
+        idx = NameIndex()
+        idx.load_from_list(["Banu", "Manu", "Galu", "Gyanu", "Ghan"])
+        
+        # First-letter candidates keep their place; one-char neighbors (ban, man) only fill in behind them
+        shortlist = [idx.candidates[i].original for i in idx.get_shortlist("gan", "g")]
+        assert shortlist == ["Galu", "Gyanu", "Ghan", "Banu", "Manu"]
+    
+    def test_neighbors_do_not_replace_full_scan(self):
+        idx = NameIndex()
+        idx.load_from_list(["Ravi", "Azaz"])
+        # Nothing shares the key or first letter: full scan as before, not just the "aza" neighbor bucket
+        assert list(idx.get_shortlist("zzz", "z")) == [0, 1]
@@ -7,7 +7,9 @@ from src.initials import (
     is_merged_initial,
     expand_merged_initial,
     classify_tokens,
-    get_first_letters_of_cores
+    get_first_letters_of_cores,
+    letter_mask,
+    mask_letters
 )
 
 
@@ -82,6 +84,13 @@ class TestClassifyTokens:
         assert result.first_core == "vignesh"
         assert result.remaining_core == ["kumar"]
     
+    def test_phonetic_cores_precomputed(self):
+        result = classify_tokens(["geetha", "sajeev", "b"])
+        assert result.phonetic_cores == ["gita", "sajiv"]
+        assert result.phonetic_first == "gita"
+        assert result.phonetic_remaining == ["sajiv"]
+        assert result.phonetic_core_joined == "gita sajiv"
+    
     def test_empty_tokens(self):
         result = classify_tokens([])
         assert result.core_tokens == []
@@ -96,3 +105,20 @@ class TestGetFirstLettersOfCores:
     
     def test_empty(self):
         assert get_first_letters_of_cores([]) == []
+
+
+class TestLetterMask:
+    """Letter bitmasks used for initials set algebra."""
+    
+    def test_round_trip_sorted(self):
+        assert mask_letters(letter_mask(["s", "g", "kumar", "g"])) == ["g", "k", "s"]
+    
+    def test_non_ascii_and_digits(self):
+        mask = letter_mask(["é", "1st", "a"])
+        assert mask_letters(mask) == ["a", "1", "é"]
+        assert mask & letter_mask(["a"]) == letter_mask(["a"])
+    
+    def test_classified_masks(self):
+        result = classify_tokens(["vignesh", "kumar", "gs"])
+        assert result.initials_mask == letter_mask(["g", "s"])
+        assert result.remaining_first_mask == letter_mask(["k"])
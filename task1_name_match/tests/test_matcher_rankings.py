@@ -141,6 +141,19 @@ class TestGanuBStrongFirstName:
         assert any("Ganesh" in n for n in top_names[:3])
 
 
+class TestGanuTies:
+    """Equal scores keep first-letter candidates ahead of one-char phonetic neighbors."""
+    
+    def test_ganu_prefers_galu_over_banu_manu(self):
+        idx = NameIndex()
+        idx.load_from_list(["Banu", "Manu", "Galu", "Gyanu", "Ghan"])
+        result = NameMatcher(idx).match("Ganu", top_k=5)
+        
+        # Galu, Banu and Manu tie on score; Galu shares the first letter
+        assert [m.name for m in result.matches] == ["Galu", "Banu", "Manu", "Gyanu", "Ghan"]
+        assert result.matches[0].score == result.matches[1].score
+
+
 class TestExtraInitialsPenalty:
     """Extra initials don't over-penalize when query has none."""
     
@@ -242,3 +255,52 @@ class TestPhoneticMatching:
         scores = {m.name: m.score for m in result.matches}
         assert scores.get("Shankar", 0) > 80
         assert scores.get("Sankar", 0) > 70
+
+
+class TestRepeatedQueries:
+    """Repeated queries on one matcher."""
+    
+    def test_repeat_gives_same_result(self):
+        """Second identical query returns the same ranking."""
+        idx = NameIndex()
+        idx.load_from_list(["Geetha", "Gita", "Geeta"])
+        matcher = NameMatcher(idx)
+        first = [(m.name, m.score) for m in matcher.match("Geetha").matches]
+        second = [(m.name, m.score) for m in matcher.match("Geetha").matches]
+        assert first == second
+    
+    def test_typeahead_shares_first_name_stage(self):
+        """Queries with the same first name reuse its scores and still rank like a fresh matcher."""
+        idx = NameIndex()
+        idx.load_from_list(["Geetha B S", "Geetha K", "Gita", "Ganesh B"])
+        matcher = NameMatcher(idx)
+        for query in ["Geetha", "Geetha B", "Geetha B S"]:
+            expected = [(m.name, m.score) for m in NameMatcher(idx).match(query).matches]
+            assert [(m.name, m.score) for m in matcher.match(query).matches] == expected
+        assert matcher._first_name_scores.cache_info().hits == 2
+    
+    def test_index_reload_invalidates_cache(self):
+        """Names added after a query are seen by the next identical query."""
+        idx = NameIndex()
+        idx.load_from_list(["Gita"])
+        matcher = NameMatcher(idx)
+        assert matcher.match("Geetha").best_match.name == "Gita"
+        idx.load_from_list(["Geetha"])
+        assert matcher.match("Geetha").best_match.name == "Geetha"
+
+
+class TestResultDicts:
+    """to_dict keeps raw floats; to_display_dict rounds for output."""
+    
+    def test_display_dict_rounds_scores(self):
+        idx = NameIndex()
+        idx.load_from_list(["Geeta", "Gita"])
+        result = NameMatcher(idx).match("Geetha")
+        raw = result.to_dict()
+        display = result.to_display_dict()
+        assert raw['best_match']['score'] == result.best_match.score
+        assert display['best_match']['score'] == round(result.best_match.score, 1)
+        assert display['best_match'] is display['matches'][0]
+        for key, value in raw['matches'][0]['breakdown'].items():
+            if isinstance(value, float):
+                assert display['matches'][0]['breakdown'][key] == round(value, 1)
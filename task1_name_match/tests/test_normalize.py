@@ -65,6 +65,12 @@ class TestIsValidName:
         assert is_valid_name("") is False
         assert is_valid_name("   ") is False
         assert is_valid_name("123") is False
+    
+    def test_non_digit_numerics_are_not_letters(self):
+        # Superscripts, vulgar fractions and Roman numeral signs are numeric, not alphabetic
+        assert is_valid_name("²") is False
+        assert is_valid_name("¼ ⅻ") is False
+        assert is_valid_name("josé") is True
 
 
 class TestNormalizeAndTokenize:
@@ -43,6 +43,11 @@ class TestPhoneticRewrite:
     def test_double_consonant_collapse(self):
         """Double consonants collapse (kannada -> kanada)."""
         assert phonetic_rewrite("kannada") == "kanada"
+    
+    def test_th_then_double_consonant(self):
+        """Rules apply in order: th -> t can create tt, which then collapses (mitthun -> mitun)."""
+        assert phonetic_rewrite("mitthun") == "mitun"
+        assert phonetic_rewrite("natthu") == "natu"
 
 
 class TestPhoneticKeyForIndex:
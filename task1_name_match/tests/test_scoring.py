@@ -0,0 +1,77 @@
+"""Scoring: batched paths agree with the per-candidate score_candidate."""
+
+import numpy as np
+import pytest
+from rapidfuzz import fuzz
+from src.index import NameIndex
+from src.normalize import normalize_text, tokenize
+from src.initials import classify_tokens
+from src.scoring import (
+    score_candidate,
+    score_candidates_fast,
+    compute_first_name_scores,
+    compute_edit_distance_scores,
+    compute_phonetic_core_scores,
+    compute_full_string_scores,
+    single_token_wratio_scores,
+)
+
+
+NAMES = [
+    "Geetha B S", "Gita", "Vignesh Kumar R", "Vignesh G.S", "Ganesh B",
+    "Ganu", "Krishna Kumar", "Sai Venkata Ramana", "K R Rao", "Amal", "José É Silva",
+    "Ravi K", "Ramesh Kumar Babu", "Suresh Krishnan",
+]
+
+
+class TestSingleTokenWRatio:
+    """single_token_wratio_scores reproduces fuzz.WRatio for single-token strings."""
+    
+    @pytest.mark.parametrize("query", ["ganu", "a", "x", "geetha", "kumaraswamy"])
+    def test_matches_wratio(self, query):
+        choices = np.array(
+            ["ganesh", "aanamika", "aaaaaaaa", "a", "", "gita", "laxmeena", "kumar", "swamy", "ganu"], dtype=object
+        )
+        lens = np.array([len(c) for c in choices])
+        expected = [fuzz.WRatio(query, c) for c in choices]
+        assert single_token_wratio_scores(query, choices, lens).tolist() == expected
+
+
+class TestFastPathMatchesBreakdown:
+    """score_candidates_fast gives exactly score_candidate().final_score."""
+    
+    @pytest.fixture
+    def index(self):
+        idx = NameIndex()
+        idx.load_from_list(NAMES)
+        return idx
+    
+    @pytest.mark.parametrize("query", [
+        "Geetha B.S", "Ganu B", "Vignesh Kumar", "K R", "Sai Ramana V", "Jose E S", "José É",
+        "Ravi Kumar", "Ramesh Kumaar B", "Suresh Ramesh Kumar", "Ravi Édouard",
+    ])
+    def test_same_final_scores(self, index, query):
+        q_normalized = normalize_text(query)
+        q_classified = classify_tokens(tokenize(q_normalized))
+        
+        fn = compute_first_name_scores(
+            q_classified.first_core, q_classified.phonetic_first,
+            index.first_core_arr, index.phonetic_first_arr,
+            index.first_len_arr, index.phonetic_first_len_arr
+        )
+        ed = compute_edit_distance_scores(q_normalized, index.normalized_arr)
+        ph = compute_phonetic_core_scores(q_classified.phonetic_core_joined, index.phonetic_core_arr)
+        fs = compute_full_string_scores(q_normalized, index.normalized_arr)
+        remaining_flat, phonetic_remaining_flat, remaining_counts = index.remaining_cores_for(index.get_all_indices())
+        fast = score_candidates_fast(
+            q_classified, index.classified_arr, fn, ed, ph, fs,
+            index.core_count_arr, index.first_len_arr,
+            index.initials_mask_arr, index.remaining_first_mask_arr, index.wide_mask_arr,
+            remaining_flat, phonetic_remaining_flat, remaining_counts
+        )
+        
+        expected = [
+            score_candidate(q_normalized, q_classified, c.normalized, c.classified).final_score
+            for c in index.candidates
+        ]
+        assert fast.tolist() == expected
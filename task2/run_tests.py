@@ -1,15 +1,25 @@
 """Pytest + smoke demo (start API, 3 sample queries). Use: python run_tests.py"""
+import asyncio
+import socket
 import subprocess
 import sys
 import time
 from pathlib import Path
 
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 PROJECT_ROOT = Path(__file__).resolve().parent
-API_URL = "http://127.0.0.1:8000"
+API_HOST, API_PORT = "127.0.0.1", 8000
+API_URL = f"http://{API_HOST}:{API_PORT}"
 SAMPLE_INPUTS = ["egg, onion", "rice, vegetables", "banana, milk, oats"]
 
+# Keep-alive session for the readiness poll (one connection, no handshake per call)
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(total=2, backoff_factor=0.1)))
+
 
 def run_pytest():
     r = subprocess.run(
@@ -19,22 +29,56 @@ def run_pytest():
     return r.returncode == 0
 
 
+def _server_options() -> dict:
+    """uvloop + httptools when installed, else asyncio + h11 (mirrors src.api.server_options without importing torch)."""
+    import importlib.util
+    return {
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+    }
+
+
+def _port_open() -> bool:
+    """Cheap TCP check before paying for an HTTP request."""
+    try:
+        with socket.create_connection((API_HOST, API_PORT), timeout=0.05):
+            return True
+    except OSError:
+        return False
+
+
 def wait_for_api(timeout=90):
-    start = time.time()
-    while time.time() - start < timeout:
-        try:
-            if requests.get(f"{API_URL}/health", timeout=2).status_code == 200:
-                return True
-        except Exception:
-            pass
-        time.sleep(0.5)
+    """Poll /health with backoff from 50 ms up to 500 ms, so readiness is seen soon after it happens."""
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while time.monotonic() < deadline:
+        if _port_open():
+            try:
+                if SESSION.get(f"{API_URL}/health", timeout=0.2).status_code == 200:
+                    return True
+            except Exception:
+                pass
+        time.sleep(delay)
+        delay = min(delay * 1.5, 0.5)
     return False
 
 
+async def _post_samples():
+    """POST every sample at once; the API batches concurrent requests, so this takes about one inference."""
+    async with httpx.AsyncClient(timeout=60) as client:
+        return await asyncio.gather(
+            *[client.post(f"{API_URL}/chat", json={"message": m}) for m in SAMPLE_INPUTS],
+            return_exceptions=True,
+        )
+
+
 def smoke_demo():
     """Start API, send 3 sample requests, print responses."""
+    # Same event loop / HTTP parser choice as `python -m src.api`; one worker (each would load the model)
+    server = _server_options()
     proc = subprocess.Popen(
-        [sys.executable, "-m", "uvicorn", "src.api:app", "--host", "127.0.0.1", "--port", "8000"],
+        [sys.executable, "-m", "uvicorn", "src.api:app", "--host", API_HOST, "--port", str(API_PORT),
+         "--loop", server["loop"], "--http", server["http"]],
         cwd=PROJECT_ROOT,
         stdout=subprocess.DEVNULL,
         stderr=subprocess.DEVNULL,
@@ -44,9 +88,11 @@ def smoke_demo():
             print("API did not become ready.")
             return False
         print("\n--- Smoke demo: 3 sample queries ---")
-        for msg in SAMPLE_INPUTS:
+        responses = asyncio.run(_post_samples())
+        for msg, r in zip(SAMPLE_INPUTS, responses):
             try:
-                r = requests.post(f"{API_URL}/chat", json={"message": msg}, timeout=60)
+                if isinstance(r, Exception):
+                    raise r
                 r.raise_for_status()
                 data = r.json()
                 title = data.get("recipe_title") or "(no title)"
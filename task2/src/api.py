@@ -1,30 +1,123 @@
-"""FastAPI: GET /health, POST /chat. Loads model+adapter at startup. Run: python -m src.api"""
+"""FastAPI: GET /health, POST /chat, POST /chat/stream (SSE). Loads model+adapter at startup. Run: python -m src.api"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from starlette.concurrency import iterate_in_threadpool
 
-from src.infer import run_inference
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as ChatJSONResponse
+except ImportError:
+    orjson = None
+    from fastapi.responses import JSONResponse as ChatJSONResponse
+
+from src.config import COMPILE_INFERENCE, INFER_WORKERS, MAX_BATCH, MAX_WAIT_MS
+from src.infer import run_inference_batch, run_inference_stream, warm_up
+
+logger = logging.getLogger(__name__)
 
 # Model loaded once at startup
 _model = None
 _tokenizer = None
 _device = None
 
+# Micro-batching: /chat puts (message, future) on the queue; one worker drains it into batched generate calls
+# that run on the inference pool, so the event loop keeps accepting and sending while generate runs.
+# Up to INFER_WORKERS batches are in flight; the next batch keeps filling while they run.
+_queue = None
+_executor = None
+
 
 def _load_model_once():
     global _model, _tokenizer, _device
     if _model is None:
-        from src.infer import _get_model_and_tokenizer
-        _model, _tokenizer, _device = _get_model_and_tokenizer()
+        from src.infer import get_model_and_tokenizer
+        _model, _tokenizer, _device = get_model_and_tokenizer()
+
+
+def _run_batch(messages: list) -> list:
+    return run_inference_batch(messages, model=_model, tokenizer=_tokenizer, device=_device)
+
+
+async def _run_and_resolve(batch: list, slots: asyncio.Semaphore):
+    loop = asyncio.get_running_loop()
+    try:
+        try:
+            results = await loop.run_in_executor(_executor, _run_batch, [message for message, _ in batch])
+        except Exception:
+            # One bad or oversized input (e.g. OOM on the padded batch) must not fail its neighbours:
+            # re-run each message alone so only the request that really fails gets the error
+            for message, fut in batch:
+                try:
+                    result = (await loop.run_in_executor(_executor, _run_batch, [message]))[0]
+                except Exception as e:
+                    if not fut.done():
+                        fut.set_exception(e)
+                    continue
+                if not fut.done():
+                    fut.set_result(result)
+            return
+    finally:
+        slots.release()
+    for (_, fut), result in zip(batch, results):
+        if not fut.done():
+            fut.set_result(result)
+
+
+async def _batch_worker():
+    """Collect up to MAX_BATCH requests (waiting at most MAX_WAIT_MS after the first), run them together."""
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(INFER_WORKERS)
+    running = set()
+    while True:
+        await slots.acquire()
+        batch = [await _queue.get()]
+        deadline = loop.time() + MAX_WAIT_MS / 1000
+        while len(batch) < MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+
+        task = asyncio.create_task(_run_and_resolve(batch, slots))
+        running.add(task)
+        task.add_done_callback(running.discard)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global _queue, _executor
     _load_model_once()
-    yield
-    # no cleanup needed
+    # One short generate before serving; a compiled model was already warmed up (and compiled) by the loader
+    if not (COMPILE_INFERENCE and _device != "cpu"):
+        try:
+            warm_up(_model, _tokenizer, _device)
+        except Exception:
+            logger.exception("Warm-up generate failed; model or device may be broken")
+    _queue = asyncio.Queue()
+    _executor = ThreadPoolExecutor(max_workers=INFER_WORKERS, thread_name_prefix="inference")
+    worker = asyncio.create_task(_batch_worker())
+    try:
+        yield
+    finally:
+        worker.cancel()
+        try:
+            await worker
+        except asyncio.CancelledError:
+            pass
+        _executor.shutdown(wait=True)
 
 
 app = FastAPI(title="Recipe Chatbot API", lifespan=lifespan)
@@ -42,21 +135,79 @@ class ChatRequest(BaseModel):
     message: str
 
 
+class ChatResponse(BaseModel):
+    """Response contract (OpenAPI docs). /chat returns the infer dict directly, so it is not re-validated."""
+    query: str
+    normalized_ingredients: list[str]
+    recipe_title: str = ""
+    ingredients: list = []
+    steps: list = []
+    time_minutes: int | None = None
+    notes: str = ""
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
 
-@app.post("/chat")
-def chat(req: ChatRequest):
-    """POST {"message": "egg, onion"} -> recipe JSON (same schema as infer)."""
-    result = run_inference(req.message, model=_model, tokenizer=_tokenizer, device=_device)
-    return result
+@app.post("/chat", response_model=ChatResponse, response_class=ChatJSONResponse)
+async def chat(req: ChatRequest):
+    """POST {"message": "egg, onion"} -> recipe JSON (same schema as infer). Batched with concurrent requests."""
+    fut = asyncio.get_running_loop().create_future()
+    await _queue.put((req.message, fut))
+    # Returning the response object skips the dict -> model -> dict pass; orjson encodes when installed
+    return ChatJSONResponse(await fut)
+
+
+def _dumps(obj) -> str:
+    """Compact JSON for one SSE data line (orjson when installed; same text either way)."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+async def _sse_events(message: str):
+    """"token" events carry decoded text as it is generated; the final "result" event is the /chat JSON.
+    The model stream is iterated on Starlette's threadpool. When the client disconnects, Starlette cancels this
+    generator, and the finally sets the stop event so generate ends at the next token instead of at MAX_NEW_TOKENS."""
+    stop = threading.Event()
+    items = run_inference_stream(message, model=_model, tokenizer=_tokenizer, device=_device, stop_event=stop)
+    try:
+        async for item in iterate_in_threadpool(items):
+            event = "result" if isinstance(item, dict) else "token"
+            yield f"event: {event}\ndata: {_dumps(item)}\n\n"
+    finally:
+        stop.set()
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """POST {"message": "egg, onion"} -> text/event-stream. Not batched: one generate call per stream."""
+    return StreamingResponse(
+        _sse_events(req.message),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+def server_options() -> dict:
+    """uvloop + httptools when installed (uvicorn[standard]; no uvloop on Windows), else asyncio + h11."""
+    import importlib.util
+    return {
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+    }
 
 
 def main():
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Each worker process loads its own copy of the model; raise UVICORN_WORKERS only if memory allows
+    workers = int(os.getenv("UVICORN_WORKERS", "1"))
+    if workers > 1:
+        uvicorn.run("src.api:app", host="0.0.0.0", port=8000, workers=workers, **server_options())
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000, **server_options())
 
 
 if __name__ == "__main__":
@@ -3,13 +3,26 @@ import json
 import sys
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 API_BASE = "http://127.0.0.1:8000"
 
 
+def _make_session() -> requests.Session:
+    """Keep-alive session: one pooled connection reused across prompts; retries only connection failures."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(total=2, backoff_factor=0.1))
+    session.mount("http://", adapter)
+    return session
+
+
+_SESSION = _make_session()
+
+
 def _call_api(message: str) -> dict | None:
     try:
-        r = requests.post(f"{API_BASE}/chat", json={"message": message}, timeout=30)
+        r = _SESSION.post(f"{API_BASE}/chat", json={"message": message}, timeout=30)
         r.raise_for_status()
         return r.json()
     except requests.RequestException:
@@ -1,4 +1,6 @@
 """Paths, model, device."""
+import os
+from functools import cache
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
@@ -13,6 +15,10 @@ ARTIFACTS_DIR = PROJECT_ROOT / "artifacts"
 ADAPTER_DIR = ARTIFACTS_DIR / "adapter"
 TRAINING_LOG_JSON = ARTIFACTS_DIR / "training_log.json"
 EVAL_REPORT_JSON = ARTIFACTS_DIR / "eval_report.json"
+INFERENCE_CACHE_DIR = ARTIFACTS_DIR / "inference_cache"
+# Tokenized train/eval Arrow files, keyed by data file contents, model id and MAX_SEQ_LEN
+TOKENIZED_CACHE_DIR = ARTIFACTS_DIR / "tokenized_cache"
+TOKENIZED_CACHE_VERSION = 1  # Bump when _tokenize output changes
 
 # Model
 BASE_MODEL_ID = "Qwen/Qwen2.5-1.5B-Instruct"
@@ -34,12 +40,27 @@ INFERENCE_SEED = 42
 
 # Inference
 MAX_NEW_TOKENS = 200
+# Greedy decoding (deterministic, no sampling overhead); False samples with TEMPERATURE / TOP_P / INFERENCE_SEED
+DETERMINISTIC_INFER = True
 TEMPERATURE = 0.2
 TOP_P = 0.9
+# torch.compile the decoder forward (GPU only) at load time; opt in with BOOKXPERT_COMPILE=1
+COMPILE_INFERENCE = os.getenv("BOOKXPERT_COMPILE") == "1"
 
+# Generated text cached per normalized input (in memory; also on disk when diskcache is installed)
+INFERENCE_CACHE_SIZE = 1024
 
+# API micro-batching: /chat requests arriving within MAX_WAIT_MS of each other share one generate call
+MAX_BATCH = 8
+MAX_WAIT_MS = 5
+# Batches allowed in flight at once (inference threads sharing the one model). A compiled model generates one
+# batch at a time (see infer._generate_lock), so a second in-flight batch could only wait and would split batches
+INFER_WORKERS = 1 if COMPILE_INFERENCE else int(os.getenv("INFER_WORKERS", "2"))
+
+
+@cache
 def get_device():
-    """cuda > mps > cpu."""
+    """cuda > mps > cpu. Probed once per process."""
     try:
         import torch
         if torch.cuda.is_available():
@@ -49,3 +70,28 @@ def get_device():
     except Exception:
         pass
     return "cpu"
+
+
+@cache
+def get_attn_implementation():
+    """flash_attention_2 on Ampere+ CUDA with flash-attn installed, else PyTorch fused SDPA."""
+    try:
+        import torch
+        if torch.cuda.is_available() and torch.cuda.get_device_capability()[0] >= 8:
+            import flash_attn  # noqa: F401
+            return "flash_attention_2"
+    except Exception:
+        pass
+    return "sdpa"
+
+
+@cache
+def get_device_map():
+    """"auto" (accelerate dispatch) only when the model must be split over several GPUs; None means load, then .to(device)."""
+    try:
+        import torch
+        if torch.cuda.device_count() > 1:
+            return "auto"
+    except Exception:
+        pass
+    return None
@@ -1,12 +1,12 @@
 """Generate train.jsonl (600) and eval.jsonl (60) deterministically. Eval disjoint from train."""
-import json
 import random
 import re
+import zlib
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
 from src.config import DATA_DIR, EVAL_JSONL, TRAIN_JSONL
-from src.dataset_format import count_lines
+from src.dataset_format import count_lines, write_jsonl
 
 
 GEN_SEED = 42
@@ -182,7 +182,7 @@ MORE_RECIPES = [
 ]
 
 
-# Conversational opener templates (assistant reply). Pick by hash(title) for reproducibility.
+# Conversational opener templates (assistant reply). Pick by crc32(title): stable across processes, unlike the salted hash().
 CONVERSATIONAL_OPENERS = [
     "You can make a **{}**! It's quick and easy.",
     "Great combo! I'd suggest **{}**.",
@@ -195,28 +195,47 @@ CONVERSATIONAL_OPENERS = [
 ]
 
 
+# Conversational phrases stripped by _normalize_input, in the order they used to be removed one by one
+_INPUT_PHRASES = [
+    "i have ", "please suggest", "what can i cook with", "give me a recipe for", "suggest recipe for",
+    "at home. what can i make?", "at home. what can i make", "what can i make?",
+    "any recipe ideas?", "any recipe ideas", "what do you recommend?", "what do you recommend",
+    "quick recipe with ", "suggest something with ", "for breakfast.", "for breakfast", "for dinner.",
+    "for dinner", "got some ", "i only have ", "—what do you recommend", " any ideas?",
+    "recipe with ", "cook with ", "make with ",
+]
+# All phrases in one left-to-right pass, longest first so "at home. what can i make?" wins over its suffixes.
+# Kept equal to the old one-by-one removal in list order: "—what do you recommend" is left out (the plain phrase
+# was always removed first, keeping the dash), and " any ideas?" matches after a space or right after a phrase
+# removed before it (whose replacement supplied the space). Only removals that glue two fragments into a new
+# phrase still differ.
+_ANY_IDEAS = " any ideas?"
+_EARLY_PHRASES = _INPUT_PHRASES[:_INPUT_PHRASES.index(_ANY_IDEAS)]
+_LATE_PHRASES = _INPUT_PHRASES[_INPUT_PHRASES.index(_ANY_IDEAS) + 1:]
+
+
+def _alternation(phrases: List[str]) -> str:
+    return "|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True) if p != "—what do you recommend")
+
+
+_PHRASE_RE = re.compile(
+    rf"(?:{_alternation(_EARLY_PHRASES)})(?:any ideas\?)?|(?<= )any ideas\?|{_alternation(_LATE_PHRASES)}",
+    re.IGNORECASE,
+)
+_WS_RE = re.compile(r"\s+")
+
+
 def _normalize_input(s: str) -> str:
     """Normalize for dedup: lowercase, collapse spaces, strip conversational phrases."""
-    s = s.lower().strip()
-    s = re.sub(r"\s+", " ", s)
-    phrases = [
-        "i have ", "please suggest", "what can i cook with", "give me a recipe for", "suggest recipe for",
-        "at home. what can i make?", "at home. what can i make", "what can i make?",
-        "any recipe ideas?", "any recipe ideas", "what do you recommend?", "what do you recommend",
-        "quick recipe with ", "suggest something with ", "for breakfast.", "for breakfast", "for dinner.",
-        "for dinner", "got some ", "i only have ", "—what do you recommend", " any ideas?",
-        "recipe with ", "cook with ", "make with ",
-    ]
-    for phrase in phrases:
-        s = re.sub(re.escape(phrase), " ", s, flags=re.IGNORECASE)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    s = _WS_RE.sub(" ", s.lower().strip())
+    s = _PHRASE_RE.sub(" ", s)
+    return _WS_RE.sub(" ", s).strip()
 
 
-def _ingredients_to_input(ingredients: List[str], variant: int) -> str:
+def _ingredients_to_input(ingredients: List[str], variant: int, rng: random.Random = random) -> str:
     """One of several input variants (comma list, conversational sentence, etc.)."""
     base = list(ingredients)
-    random.shuffle(base)
+    rng.shuffle(base)
     and_joined = " and ".join(base)
     comma_joined = ", ".join(base)
     # Mix of short and conversational variants
@@ -252,7 +271,7 @@ def _ingredients_to_input(ingredients: List[str], variant: int) -> str:
 
 def _recipe_to_output(title: str, ingredients: List[str], steps: List[str], time_min: int, tips: str) -> str:
     """Opener + structured block (Recipe / Ingredients / Steps / Time / Tips)."""
-    opener_idx = hash(title) % len(CONVERSATIONAL_OPENERS)
+    opener_idx = zlib.crc32(title.encode("utf-8")) % len(CONVERSATIONAL_OPENERS)
     opener = CONVERSATIONAL_OPENERS[opener_idx].format(title)
     structured = [
         f"Recipe: {title}",
@@ -266,47 +285,64 @@ def _recipe_to_output(title: str, ingredients: List[str], steps: List[str], time
 
 def _build_examples(seed: int) -> Tuple[List[dict], List[dict]]:
     """Build 600 train + 60 eval, disjoint."""
-    random.seed(seed)
+    # Private generator: same stream as seeding the module-level one, without touching global state, and the
+    # bound methods skip the module attribute lookups in the refill loops
+    rng = random.Random(seed)
+    choice, randint = rng.choice, rng.randint
     templates = RECIPE_TEMPLATES + MORE_RECIPES
+    # Output text depends only on the recipe, so build it once per template, not once per input variant
+    recipes = [
+        (ing_list, _recipe_to_output(title, ings, steps, time_min, tips))
+        for ing_list, title, ings, steps, time_min, tips in templates
+    ]
     all_records: List[dict] = []
     seen_inputs: set = set()
+    # Normalized form per raw input, computed once: variants repeat verbatim (same template, variant, shuffle)
+    # and every record is looked up again for the eval/train split below
+    norm_of: Dict[str, str] = {}
+
+    def normalized(inp: str) -> str:
+        norm = norm_of.get(inp)
+        if norm is None:
+            norm = norm_of[inp] = _normalize_input(inp)
+        return norm
 
     # Many variants per recipe to get 660+ unique inputs
-    for (ing_list, title, ings, steps, time_min, tips) in templates:
+    for ing_list, output in recipes:
         for variant in range(16):
-            inp = _ingredients_to_input(ing_list, variant)
-            norm = _normalize_input(inp)
+            inp = _ingredients_to_input(ing_list, variant, rng)
+            norm = normalized(inp)
             if norm in seen_inputs:
                 continue
             seen_inputs.add(norm)
-            all_records.append({"input": inp, "output": _recipe_to_output(title, ings, steps, time_min, tips)})
+            all_records.append({"input": inp, "output": output})
 
     # Refill until we have at least 660 (with guard)
     for _ in range(2000):
         if len(all_records) >= 660:
             break
-        ing_list, title, ings, steps, time_min, tips = random.choice(templates)
-        inp = _ingredients_to_input(ing_list, random.randint(0, 99))
-        norm = _normalize_input(inp)
+        ing_list, output = choice(recipes)
+        inp = _ingredients_to_input(ing_list, randint(0, 99), rng)
+        norm = normalized(inp)
         if norm not in seen_inputs:
             seen_inputs.add(norm)
-            all_records.append({"input": inp, "output": _recipe_to_output(title, ings, steps, time_min, tips)})
+            all_records.append({"input": inp, "output": output})
 
-    random.shuffle(all_records)
+    rng.shuffle(all_records)
     eval_records = all_records[-60:]
-    eval_norms = {_normalize_input(r["input"]) for r in eval_records}
-    train_records = [r for r in all_records[:-60] if _normalize_input(r["input"]) not in eval_norms]
+    eval_norms = {norm_of[r["input"]] for r in eval_records}
+    train_records = [r for r in all_records[:-60] if norm_of[r["input"]] not in eval_norms]
     # Refill train to 600 if needed (max 500 attempts)
-    train_norms = {_normalize_input(r["input"]) for r in train_records}
+    train_norms = {norm_of[r["input"]] for r in train_records}
     for _ in range(500):
         if len(train_records) >= 600:
             break
-        ing_list, title, ings, steps, time_min, tips = random.choice(templates)
-        inp = _ingredients_to_input(ing_list, random.randint(0, 99))
-        norm = _normalize_input(inp)
+        ing_list, output = choice(recipes)
+        inp = _ingredients_to_input(ing_list, randint(0, 99), rng)
+        norm = normalized(inp)
         if norm not in eval_norms and norm not in train_norms:
             train_norms.add(norm)
-            train_records.append({"input": inp, "output": _recipe_to_output(title, ings, steps, time_min, tips)})
+            train_records.append({"input": inp, "output": output})
 
     return train_records[:600], eval_records[:60]
 
@@ -319,12 +355,8 @@ def generate_dataset(
     """Write train.jsonl and eval.jsonl; creates data dir if needed."""
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     train_records, eval_records = _build_examples(seed)
-    with open(train_path, "w", encoding="utf-8") as f:
-        for r in train_records:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
-    with open(eval_path, "w", encoding="utf-8") as f:
-        for r in eval_records:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    write_jsonl(train_path, train_records)
+    write_jsonl(eval_path, eval_records)
 
 
 if __name__ == "__main__":
@@ -1,30 +1,45 @@
 """Run inference on eval.jsonl (first N), report JSON/title/steps rates to stdout and eval_report.json."""
 import json
 import sys
+from itertools import islice
 from pathlib import Path
 
-from src.config import ARTIFACTS_DIR, EVAL_JSONL, EVAL_REPORT_JSON
+from src.config import ARTIFACTS_DIR, EVAL_JSONL, EVAL_REPORT_JSON, MAX_BATCH
 from src.dataset_format import load_jsonl
-from src.infer import run_inference
+from src.infer import get_model_and_tokenizer, run_inference, run_inference_batch
 
 DEFAULT_LIMIT = 20
+# Records per generate call (calls run in-process, no HTTP)
+DEFAULT_BATCH_SIZE = MAX_BATCH
 
 
-def main(limit: int = DEFAULT_LIMIT):
+def main(limit: int = DEFAULT_LIMIT, batch_size: int = DEFAULT_BATCH_SIZE):
     ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
-    records = list(load_jsonl(EVAL_JSONL))[:limit]
+    records = list(islice(load_jsonl(EVAL_JSONL), limit))
+    model, tokenizer, device = get_model_and_tokenizer()
+
+    outs = []
+    for start in range(0, len(records), batch_size):
+        inputs = [r["input"] for r in records[start:start + batch_size]]
+        try:
+            outs.extend(run_inference_batch(inputs, model=model, tokenizer=tokenizer, device=device))
+        except Exception as e:
+            # Retry one by one so a single bad input only costs its own record
+            print(f"Batch starting '{inputs[0][:50]}...' failed ({e}); retrying per record", file=sys.stderr)
+            for inp in inputs:
+                try:
+                    outs.append(run_inference(inp, model=model, tokenizer=tokenizer, device=device))
+                except Exception as e:
+                    print(f"Inference failed for '{inp[:50]}...': {e}", file=sys.stderr)
+                    outs.append(None)
 
     n_valid_json = 0
     n_has_title = 0
     n_steps_ok = 0
     total = len(records)
 
-    for r in records:
-        inp = r["input"]
-        try:
-            out = run_inference(inp)
-        except Exception as e:
-            print(f"Inference failed for '{inp[:50]}...': {e}", file=sys.stderr)
+    for out in outs:
+        if out is None:
             continue
         try:
             json.dumps(out)
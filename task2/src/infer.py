@@ -1,22 +1,65 @@
 """Load base + LoRA adapter, generate recipe from ingredients. Returns JSON for API. Adapter required."""
 import argparse
 import json
+import logging
 import re
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+from functools import lru_cache
 from pathlib import Path
 
 import torch
 from peft import PeftModel
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from transformers import (
+    AutoModelForCausalLM,
+    AutoTokenizer,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
+)
 
 from src.config import (
     ADAPTER_DIR,
     BASE_MODEL_ID,
+    COMPILE_INFERENCE,
+    DETERMINISTIC_INFER,
+    get_attn_implementation,
     get_device,
+    get_device_map,
+    INFERENCE_CACHE_DIR,
+    INFERENCE_CACHE_SIZE,
     INFERENCE_SEED,
     MAX_NEW_TOKENS,
     TEMPERATURE,
     TOP_P,
 )
+from src.dataset_gen import _normalize_input
+
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Generated text per _cache_key. Inputs with the same key ("I have egg, onion" / "egg, onion") reuse one
+# generation; query and normalized_ingredients are still parsed from each raw message.
+_text_cache: "OrderedDict[str, str]" = OrderedDict()
+_text_cache_lock = threading.Lock()
+_disk_cache = None
+
+# Loaded model singleton (see get_model_and_tokenizer); a failed load is not cached, the next call retries
+_model_cache = None
+_model_cache_lock = threading.Lock()
+# Held around every generate call. A no-op unless the forward is compiled with mode="reduce-overhead": its CUDA
+# graphs replay into static output buffers, so two threads generating at once would overwrite each other's logits
+_generate_lock = nullcontext()
 
 
 def _adapter_present() -> bool:
@@ -26,7 +69,7 @@ def _adapter_present() -> bool:
     return (ADAPTER_DIR / "adapter_config.json").exists()
 
 
-def _get_model_and_tokenizer():
+def _load_model_and_tokenizer():
     """Load base + LoRA adapter. Raises if adapter missing."""
     if not _adapter_present():
         raise FileNotFoundError(
@@ -34,15 +77,19 @@ def _get_model_and_tokenizer():
             "Run: python -m src.train_lora and ensure artifacts/adapter/ contains the adapter files."
         )
     device = get_device()
-    tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL_ID, trust_remote_code=True)
+    tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL_ID, trust_remote_code=True, use_fast=True)
+    if not tokenizer.is_fast:
+        raise RuntimeError(f"{BASE_MODEL_ID} has no fast (Rust) tokenizer; tokenization would run in Python")
     model = AutoModelForCausalLM.from_pretrained(
         BASE_MODEL_ID,
         torch_dtype=torch.float32 if device == "cpu" else torch.bfloat16,
-        device_map="auto" if device != "cpu" else None,
+        device_map=get_device_map(),
+        attn_implementation=get_attn_implementation(),
         trust_remote_code=True,
     )
-    if device == "cpu":
-        model = model.to("cpu")
+    # One device: plain .to() instead of accelerate dispatch hooks wrapping every submodule forward
+    if get_device_map() is None:
+        model = model.to(device)
     try:
         model = PeftModel.from_pretrained(model, str(ADAPTER_DIR))
     except Exception as e:
@@ -50,12 +97,120 @@ def _get_model_and_tokenizer():
             f"Could not load adapter from {ADAPTER_DIR}: {e}. "
             "Ensure artifacts/adapter/ contains adapter_config.json and adapter weights."
         ) from e
+    # Fold B @ A into the base weights: one matmul per projection and no adapter hooks at decode time.
+    # Quantized bases cannot be merged; those keep the PeftModel wrapper. Any other merge failure is a real error.
+    if getattr(model, "is_loaded_in_4bit", False) or getattr(model, "is_loaded_in_8bit", False):
+        logger.warning("Quantized base model: LoRA adapter not merged, decoding through the PeftModel wrapper")
+    else:
+        model = model.merge_and_unload()
+    model.eval()
+    if COMPILE_INFERENCE and device != "cpu":
+        global _generate_lock
+        # generate() calls self.forward, so compile the bound forward rather than wrapping the module
+        model.forward = torch.compile(model.forward, mode="reduce-overhead", fullgraph=False, dynamic=True)
+        _generate_lock = threading.Lock()
+        # Compile now, inside inference_mode, instead of on the first request. Uncompiled loads skip this;
+        # the API warms those up in its lifespan, and one-shot callers (eval, CLI) have no use for it.
+        # A failure is logged loudly but does not block startup; the first request then retries the same path.
+        try:
+            warm_up(model, tokenizer, device)
+        except Exception:
+            logger.exception("Warm-up generate failed; model or device may be broken")
     return model, tokenizer, device
 
 
-def _prompt_for_inference(ingredients: str) -> str:
-    """Qwen chat prompt for ingredients."""
-    return f"<|im_start|>user\n{ingredients}<|im_end|>\n<|im_start|>assistant\n"
+def get_model_and_tokenizer():
+    """(model, tokenizer, device), loaded on first use and shared by every caller in the process."""
+    global _model_cache
+    if _model_cache is None:
+        with _model_cache_lock:
+            if _model_cache is None:
+                _model_cache = _load_model_and_tokenizer()
+    return _model_cache
+
+
+# Patterns compiled once at import (parse/normalize run on every response)
+_DIGITS_RE = re.compile(r"(\d+)")
+# Stripped in one pass; no phrase overlaps another, so this equals removing them one by one
+_INGREDIENT_PHRASE_RE = re.compile(
+    "|".join(re.escape(p) for p in ["what can i cook with", "please suggest", "ingredients:", "recipe for", "i have"]),
+    re.IGNORECASE,
+)
+_WS_RE = re.compile(r"\s+")
+_INGREDIENT_SPLIT_RE = re.compile(r"[,&\s]+| and ")
+
+
+# Qwen chat prompt: _PROMPT_PREFIX + ingredients + _PROMPT_SUFFIX
+_PROMPT_PREFIX = "<|im_start|>user\n"
+_PROMPT_SUFFIX = "<|im_end|>\n<|im_start|>assistant\n"
+_MAX_PROMPT_TOKENS = 512
+
+
+@lru_cache(maxsize=4)
+def _template_ids(tokenizer) -> tuple:
+    """Token ids of the fixed prompt prefix/suffix, encoded once per tokenizer."""
+    return (
+        tokenizer.encode(_PROMPT_PREFIX, add_special_tokens=False),
+        tokenizer.encode(_PROMPT_SUFFIX, add_special_tokens=False),
+    )
+
+
+@lru_cache(maxsize=4)
+def _pad_token_id(tokenizer) -> int:
+    """Pad id for left padding and generate(), resolved once per tokenizer (eos when it has no pad token)."""
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    return tokenizer.pad_token_id
+
+
+def _encode_prompts(messages: list, tokenizer, target_device) -> dict:
+    """Left-padded input_ids/attention_mask for the chat prompts, built directly on target_device in one copy.
+    Only the messages go through the tokenizer; the template ids are reused. As before, a prompt longer than
+    _MAX_PROMPT_TOKENS is cut at the end."""
+    prefix_ids, suffix_ids = _template_ids(tokenizer)
+    rows = [
+        (prefix_ids + ids + suffix_ids)[:_MAX_PROMPT_TOKENS]
+        for ids in tokenizer(messages, add_special_tokens=False)["input_ids"]
+    ]
+    width = max(len(r) for r in rows)
+    pad_id = _pad_token_id(tokenizer)
+    # Decoder-only: pad on the left so every prompt ends where generation starts
+    input_ids = [[pad_id] * (width - len(r)) + r for r in rows]
+    attention_mask = [[0] * (width - len(r)) + [1] * len(r) for r in rows]
+    # Both rows in one tensor: a single host-to-device copy, then two views on the device
+    input_ids, attention_mask = torch.tensor([input_ids, attention_mask], dtype=torch.long, device=target_device)
+    return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+
+def _find_json_block(text: str):
+    """First balanced {...} block in text, or None. One linear scan; braces inside JSON strings are skipped.
+    If an earlier { never closes, the earliest block that did close is returned."""
+    first = text.find("{")
+    if first < 0:
+        return None
+    opens = []
+    best = None
+    in_str = escape = False
+    for i in range(first, len(text)):
+        c = text[i]
+        if in_str:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_str = False
+        elif c == '"':
+            in_str = True
+        elif c == "{":
+            opens.append(i)
+        elif c == "}" and opens:
+            start = opens.pop()
+            if not opens:
+                return text[start:i + 1]
+            if best is None or start < best[0]:
+                best = (start, i + 1)
+    return text[best[0]:best[1]] if best else None
 
 
 def _parse_model_output(text: str, query: str) -> dict:
@@ -72,10 +227,10 @@ def _parse_model_output(text: str, query: str) -> dict:
     }
 
     # Try JSON block first
-    json_match = re.search(r"\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}", text, re.DOTALL)
-    if json_match:
+    json_block = _find_json_block(text)
+    if json_block:
         try:
-            data = json.loads(json_match.group())
+            data = json.loads(json_block)
             result["recipe_title"] = data.get("recipe_title", data.get("name", "")) or result["recipe_title"]
             result["ingredients"] = data.get("ingredients", result["ingredients"])
             if isinstance(result["ingredients"], str):
@@ -101,7 +256,7 @@ def _parse_model_output(text: str, query: str) -> dict:
             part = line.replace("Steps:", "").strip()
             result["steps"] = [s.strip() for s in part.split("|") if s.strip()]
         elif line.startswith("Time:"):
-            m = re.search(r"(\d+)", line)
+            m = _DIGITS_RE.search(line)
             if m:
                 result["time_minutes"] = int(m.group(1))
         elif line.startswith("Tips:"):
@@ -116,44 +271,222 @@ def _parse_model_output(text: str, query: str) -> dict:
 
 def _normalize_ingredients(query: str) -> list:
     """Extract ingredient tokens from query (lowercase, strip phrases)."""
-    s = query.lower().strip()
-    for phrase in ["i have", "please suggest", "what can i cook with", "ingredients:", "recipe for"]:
-        s = re.sub(re.escape(phrase), "", s, flags=re.IGNORECASE)
-    s = re.sub(r"\s+", " ", s)
-    parts = re.split(r"[,&\s]+| and ", s)
+    s = _INGREDIENT_PHRASE_RE.sub("", query.lower().strip())
+    s = _WS_RE.sub(" ", s)
+    parts = _INGREDIENT_SPLIT_RE.split(s)
     return [p.strip() for p in parts if len(p.strip()) > 1]
 
 
-def run_inference(message: str, model=None, tokenizer=None, device=None) -> dict:
-    """Generate recipe for ingredients; returns dict for API. Loads model once if not passed."""
-    if model is None or tokenizer is None:
-        model, tokenizer, device = _get_model_and_tokenizer()
+# _normalize_input strips these with the rest of the conversational phrases, but they change what the model writes
+# ("eggs for breakfast" vs "eggs for dinner", "quick recipe with"), so they stay in the cache key. The key is
+# lossy on purpose otherwise: rewordings like "I have ..." / "please suggest ..." share one entry.
+_PROMPT_HINT_RE = re.compile(r"\b(breakfast|dinner|quick)\b", re.IGNORECASE)
+
+
+def _cache_key(message: str) -> str:
+    """Text-cache key: the normalized ingredients plus any prompt-changing hints found in the raw message."""
+    norm = _normalize_input(message)
+    hints = sorted({h.lower() for h in _PROMPT_HINT_RE.findall(message)})
+    return f"{norm} [{' '.join(hints)}]" if hints else norm
+
+
+def _uses_shared_model(model) -> bool:
+    """Cached text came from the singleton model; a different model passed in explicitly must not reuse it."""
+    return model is None or (_model_cache is not None and model is _model_cache[0])
+
+
+def _disk_key(norm: str) -> tuple:
+    """Disk entries outlive the process: key on everything that changes the generated text."""
+    weights = ADAPTER_DIR / "adapter_model.safetensors"
+    adapter_version = weights.stat().st_mtime_ns if weights.exists() else None
+    sampling = (TEMPERATURE, TOP_P, INFERENCE_SEED) if not DETERMINISTIC_INFER else None
+    return (BASE_MODEL_ID, adapter_version, MAX_NEW_TOKENS, sampling, norm)
+
+
+def _get_disk_cache():
+    global _disk_cache
+    if _disk_cache is None and diskcache is not None:
+        _disk_cache = diskcache.Cache(str(INFERENCE_CACHE_DIR))
+    return _disk_cache
 
-    prompt = _prompt_for_inference(message)
-    inputs = tokenizer(prompt, return_tensors="pt", truncation=True, max_length=512)
-    if device == "cpu":
-        inputs = {k: v.to("cpu") for k, v in inputs.items()}
-    else:
-        inputs = {k: v.to(model.device) for k, v in inputs.items()}
 
+def _cached_text(norm: str):
+    with _text_cache_lock:
+        text = _text_cache.get(norm)
+        if text is not None:
+            _text_cache.move_to_end(norm)
+            return text
+    disk = _get_disk_cache()
+    if disk is None:
+        return None
+    text = disk.get(_disk_key(norm))
+    if text is not None:
+        _remember_text(norm, text, to_disk=False)
+    return text
+
+
+def _remember_text(norm: str, text: str, to_disk: bool = True) -> None:
+    with _text_cache_lock:
+        _text_cache[norm] = text
+        _text_cache.move_to_end(norm)
+        while len(_text_cache) > INFERENCE_CACHE_SIZE:
+            _text_cache.popitem(last=False)
+    disk = _get_disk_cache() if to_disk else None
+    if disk is not None:
+        disk.set(_disk_key(norm), text)
+
+
+@lru_cache(maxsize=8)
+def _base_generation_kwargs(tokenizer, max_new_tokens: int) -> dict:
+    """generate() kwargs that only depend on the tokenizer and config; built once, copied per call."""
     gen_kw = dict(
-        max_new_tokens=MAX_NEW_TOKENS,
-        temperature=TEMPERATURE,
-        top_p=TOP_P,
-        do_sample=True,
-        pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id,
+        max_new_tokens=max_new_tokens,
+        num_beams=1,
+        use_cache=True,
+        eos_token_id=tokenizer.eos_token_id,
+        pad_token_id=_pad_token_id(tokenizer),
     )
-    try:
+    if DETERMINISTIC_INFER:
+        # Greedy: no top-p sort or multinomial per step, no RNG, same output every run
+        gen_kw["do_sample"] = False
+    else:
+        gen_kw.update(do_sample=True, temperature=TEMPERATURE, top_p=TOP_P)
+    return gen_kw
+
+
+def _generation_kwargs(tokenizer, max_new_tokens: int) -> dict:
+    """generate() kwargs shared by the batched and streaming paths (seeds the RNG when sampling)."""
+    if not DETERMINISTIC_INFER:
+        # Seeds every device's default generator, which is what generate() samples from
         torch.manual_seed(INFERENCE_SEED)
-        if hasattr(torch, "generator") and device != "cpu":
-            gen_kw["generator"] = torch.Generator(device=model.device).manual_seed(INFERENCE_SEED)
-    except Exception:
-        pass
+    return dict(_base_generation_kwargs(tokenizer, max_new_tokens))
+
+
+def _generate_texts(messages: list, model, tokenizer, device, max_new_tokens: int = MAX_NEW_TOKENS) -> list:
+    """One generate call for all messages; decoded completion per message, same order.
+    Encoding, generation and slicing all run under inference_mode, so no autograd state is built anywhere."""
+    gen_kw = _generation_kwargs(tokenizer, max_new_tokens)
     with torch.inference_mode():
-        out = model.generate(**inputs, **gen_kw)
+        inputs = _encode_prompts(messages, tokenizer, "cpu" if device == "cpu" else model.device)
+        with _generate_lock:
+            out = model.generate(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"], **gen_kw)
+        prompt_len = inputs["input_ids"].shape[1]
+        completions = out[:, prompt_len:]
+    # No cleanup pass: it only rewrites spaces before punctuation, which Qwen's byte-level BPE never needs
+    return tokenizer.batch_decode(completions, skip_special_tokens=True, clean_up_tokenization_spaces=False)
+
+
+def warm_up(model, tokenizer, device) -> None:
+    """One short uncached generate so kernel setup and tokenizer warm-up happen before the first real request."""
+    _generate_texts(["warmup: egg, onion"], model, tokenizer, device, max_new_tokens=8)
+
+
+def run_inference(message: str, model=None, tokenizer=None, device=None) -> dict:
+    """Generate recipe for ingredients; returns dict for API. Uses the shared model singleton if none is passed."""
+    return run_inference_batch([message], model=model, tokenizer=tokenizer, device=device)[0]
+
+
+def run_inference_batch(messages: list, model=None, tokenizer=None, device=None) -> list:
+    """Generate recipes for several ingredient messages in one generate call; one dict per message, same order.
+    Cached inputs (see _cache_key) skip generation; the model is only loaded if something is missing.
+    An explicit model other than the shared singleton bypasses the cache entirely."""
+    use_cache = _uses_shared_model(model)
+    norms = [_cache_key(m) for m in messages]
+    texts = {}
+    to_generate = []
+    for message, norm in zip(messages, norms):
+        if norm in texts:
+            continue
+        texts[norm] = _cached_text(norm) if use_cache else None
+        if texts[norm] is None:
+            to_generate.append((norm, message))
 
-    decoded = tokenizer.decode(out[0][inputs["input_ids"].shape[1]:], skip_special_tokens=True)
-    return _parse_model_output(decoded, message)
+    if to_generate:
+        if model is None or tokenizer is None:
+            model, tokenizer, device = get_model_and_tokenizer()
+        generated = _generate_texts([m for _, m in to_generate], model, tokenizer, device)
+        for (norm, _), text in zip(to_generate, generated):
+            texts[norm] = text
+            if use_cache:
+                _remember_text(norm, text)
+
+    return [_parse_model_output(texts[norm], message) for message, norm in zip(messages, norms)]
+
+
+class _StopOnEvent(StoppingCriteria):
+    """Ends generate at the next token once the event is set (e.g. the streaming client went away)."""
+
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+
+def run_inference_stream(message: str, model=None, tokenizer=None, device=None, stop_event: threading.Event = None):
+    """Yield completion text chunks as they are decoded, then the parsed result dict last.
+    generate runs on a background thread feeding a TextIteratorStreamer; a cached input yields its text in one chunk.
+    Setting stop_event stops generation after the current token; a stopped stream yields no result and is not cached."""
+    use_cache = _uses_shared_model(model)
+    norm = _cache_key(message)
+    text = _cached_text(norm) if use_cache else None
+    if text is not None:
+        yield text
+        yield _parse_model_output(text, message)
+        return
+
+    if model is None or tokenizer is None:
+        model, tokenizer, device = get_model_and_tokenizer()
+    if stop_event is None:
+        stop_event = threading.Event()
+    gen_kw = _generation_kwargs(tokenizer, MAX_NEW_TOKENS)
+    streamer = TextIteratorStreamer(
+        tokenizer, skip_prompt=True, skip_special_tokens=True, clean_up_tokenization_spaces=False
+    )
+    stopping = StoppingCriteriaList([_StopOnEvent(stop_event)])
+    errors = []
+
+    def _generate():
+        # inference_mode is thread-local, so it is entered on the generating thread
+        try:
+            with torch.inference_mode():
+                inputs = _encode_prompts([message], tokenizer, "cpu" if device == "cpu" else model.device)
+                with _generate_lock:
+                    model.generate(
+                        input_ids=inputs["input_ids"],
+                        attention_mask=inputs["attention_mask"],
+                        streamer=streamer,
+                        stopping_criteria=stopping,
+                        **gen_kw,
+                    )
+        except Exception as e:
+            errors.append(e)
+            streamer.end()
+
+    thread = threading.Thread(target=_generate, name="inference-stream", daemon=True)
+    thread.start()
+    chunks = []
+    finished = False
+    try:
+        for chunk in streamer:
+            if chunk:
+                chunks.append(chunk)
+                yield chunk
+        finished = True
+    finally:
+        # Closed early by the consumer: stop generating instead of running on to MAX_NEW_TOKENS
+        if not finished:
+            stop_event.set()
+    thread.join()
+    if errors:
+        raise errors[0]
+    if stop_event.is_set():
+        return
+
+    text = "".join(chunks)
+    if use_cache:
+        _remember_text(norm, text)
+    yield _parse_model_output(text, message)
 
 
 def main():
@@ -161,7 +494,10 @@ def main():
     parser.add_argument("--message", type=str, default="egg, onion", help="Ingredient list")
     args = parser.parse_args()
     result = run_inference(args.message)
-    print(json.dumps(result, indent=2))
+    if orjson is not None:
+        print(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode())
+    else:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
 
 
 if __name__ == "__main__":
@@ -1,19 +1,31 @@
 """LoRA SFT for Qwen2.5-1.5B-Instruct. Saves adapter to artifacts/adapter/, log to training_log.json."""
+import hashlib
 import json
 import math
+import os
 from pathlib import Path
 
+# Rust tokenizer threads for the batched Dataset.map; must be set before transformers is imported
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "true")
+
 import torch
 from datasets import Dataset
-from peft import LoraConfig, get_peft_model, TaskType
+from peft import LoraConfig, get_peft_model, prepare_model_for_kbit_training, TaskType
 from transformers import (
     AutoModelForCausalLM,
     AutoTokenizer,
+    BitsAndBytesConfig,
     TrainingArguments,
     Trainer,
     DataCollatorForSeq2Seq,
 )
 
+try:
+    # transformers>=4.44; FlashAttention-2 reads the packed boundaries from position_ids
+    from transformers import DataCollatorWithFlattening
+except ImportError:
+    DataCollatorWithFlattening = None
+
 from src.config import (
     ADAPTER_DIR,
     ARTIFACTS_DIR,
@@ -29,9 +41,13 @@ from src.config import (
     MAX_SEQ_LEN,
     MAX_STEPS,
     NUM_EPOCHS,
+    TOKENIZED_CACHE_DIR,
+    TOKENIZED_CACHE_VERSION,
     TRAIN_JSONL,
     TRAINING_LOG_JSON,
+    get_attn_implementation,
     get_device,
+    get_device_map,
 )
 from src.dataset_format import load_jsonl
 
@@ -40,6 +56,14 @@ def _load_jsonl_to_list(path: Path) -> list:
     return list(load_jsonl(path))
 
 
+def _tokenized_cache_file(split: str, source: Path) -> str:
+    """Arrow cache path for a tokenized split; any change to the data, model or tokenizer settings gives a new name.
+    The name must carry the key: Dataset.map reuses an existing cache_file_name without checking it."""
+    key = hashlib.sha256(f"{TOKENIZED_CACHE_VERSION}|{BASE_MODEL_ID}|{MAX_SEQ_LEN}|".encode())
+    key.update(source.read_bytes())
+    return str(TOKENIZED_CACHE_DIR / f"{split}-{key.hexdigest()[:16]}.arrow")
+
+
 def _build_chat_prompt(input_text: str) -> str:
     """Qwen chat format: user + assistant start."""
     return f"<|im_start|>user\n{input_text}<|im_end|>\n<|im_start|>assistant\n"
@@ -47,25 +71,26 @@ def _build_chat_prompt(input_text: str) -> str:
 
 def _tokenize(examples: dict, tokenizer) -> dict:
     """Tokenize input/output; labels -100 on input, token ids on output.
-    examples: batched dict with "input" and "output" lists."""
+    examples: batched dict with "input" and "output" lists. One tokenizer call per column, not two per example."""
     inputs = [_build_chat_prompt(inp) for inp in examples["input"]]
-    outputs = list(examples["output"])
+    inp_batch = tokenizer(inputs, add_special_tokens=False, truncation=True, max_length=MAX_SEQ_LEN - 64)
+    # Truncating the output to MAX_SEQ_LEN here and the joined ids below keeps the same prefix as a per-example
+    # max_length of MAX_SEQ_LEN - len(prompt)
+    out_batch = tokenizer(list(examples["output"]), add_special_tokens=False, truncation=True, max_length=MAX_SEQ_LEN)
     all_input_ids = []
     all_labels = []
-    for inp, out in zip(inputs, outputs):
-        inp_tok = tokenizer(inp, add_special_tokens=False, truncation=True, max_length=MAX_SEQ_LEN - 64)
-        out_tok = tokenizer(out, add_special_tokens=False, truncation=True, max_length=MAX_SEQ_LEN - len(inp_tok["input_ids"]))
-        inp_ids = inp_tok["input_ids"]
-        out_ids = out_tok["input_ids"]
-        full = inp_ids + out_ids
-        if len(full) > MAX_SEQ_LEN:
-            full = full[:MAX_SEQ_LEN]
-            out_len = MAX_SEQ_LEN - len(inp_ids)
-            out_ids = full[len(inp_ids):]
-        labels = [-100] * len(inp_ids) + out_ids
+    for inp_ids, out_ids in zip(inp_batch["input_ids"], out_batch["input_ids"]):
+        full = (inp_ids + out_ids)[:MAX_SEQ_LEN]
+        labels = [-100] * len(inp_ids) + full[len(inp_ids):]
         all_input_ids.append(full)
         all_labels.append(labels)
-    return {"input_ids": all_input_ids, "labels": all_labels, "attention_mask": [[1] * len(x) for x in all_input_ids]}
+    return {
+        "input_ids": all_input_ids,
+        "labels": all_labels,
+        "attention_mask": [[1] * len(x) for x in all_input_ids],
+        # Read by the length-grouped sampler; Trainer drops it before collation
+        "length": [len(x) for x in all_input_ids],
+    }
 
 
 def main():
@@ -75,17 +100,39 @@ def main():
     ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
     ADAPTER_DIR.mkdir(parents=True, exist_ok=True)
 
-    tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL_ID, trust_remote_code=True)
+    tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL_ID, trust_remote_code=True, use_fast=True)
+    if not tokenizer.is_fast:
+        raise RuntimeError(f"{BASE_MODEL_ID} has no fast (Rust) tokenizer; tokenization would run in Python")
     if tokenizer.pad_token is None:
         tokenizer.pad_token = tokenizer.eos_token
-    model = AutoModelForCausalLM.from_pretrained(
-        BASE_MODEL_ID,
-        torch_dtype=torch.float32 if device == "cpu" else torch.bfloat16,
-        device_map="auto" if device != "cpu" else None,
-        trust_remote_code=True,
-    )
-    if device == "cpu":
-        model = model.to("cpu")
+    # QLoRA on CUDA: frozen base in 4-bit NF4 (double-quantized), bf16 compute; bitsandbytes is CUDA-only,
+    # so mps/cpu keep the full-precision base
+    use_qlora = device == "cuda"
+    if use_qlora:
+        bnb_config = BitsAndBytesConfig(
+            load_in_4bit=True,
+            bnb_4bit_quant_type="nf4",
+            bnb_4bit_use_double_quant=True,
+            bnb_4bit_compute_dtype=torch.bfloat16,
+        )
+        model = AutoModelForCausalLM.from_pretrained(
+            BASE_MODEL_ID,
+            quantization_config=bnb_config,
+            # 4-bit weights cannot be moved after loading, so even one GPU gets an explicit map
+            device_map=get_device_map() or {"": torch.cuda.current_device()},
+            attn_implementation=get_attn_implementation(),
+            trust_remote_code=True,
+        )
+    else:
+        model = AutoModelForCausalLM.from_pretrained(
+            BASE_MODEL_ID,
+            torch_dtype=torch.float32 if device == "cpu" else torch.bfloat16,
+            device_map=get_device_map(),
+            attn_implementation=get_attn_implementation(),
+            trust_remote_code=True,
+        )
+        if get_device_map() is None:
+            model = model.to(device)
 
     train_records = _load_jsonl_to_list(TRAIN_JSONL)
     eval_records = _load_jsonl_to_list(EVAL_JSONL)
@@ -96,29 +143,45 @@ def main():
         [{"input": r["input"], "output": r["output"]} for r in eval_records]
     )
 
+    # Re-runs on unchanged data load the Arrow files instead of tokenizing again
+    TOKENIZED_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
     def tokenize_fn(examples):
         return _tokenize(examples, tokenizer)
 
     train_data = train_data.map(
         tokenize_fn,
         batched=True,
+        batch_size=64,
         remove_columns=train_data.column_names,
+        cache_file_name=_tokenized_cache_file("train", TRAIN_JSONL),
+        load_from_cache_file=True,
         desc="Tokenize train",
     )
     eval_data = eval_data.map(
         tokenize_fn,
         batched=True,
+        batch_size=64,
         remove_columns=eval_data.column_names,
+        cache_file_name=_tokenized_cache_file("eval", EVAL_JSONL),
+        load_from_cache_file=True,
         desc="Tokenize eval",
     )
 
-    data_collator = DataCollatorForSeq2Seq(
-        tokenizer=tokenizer,
-        padding=True,
-        max_length=MAX_SEQ_LEN,
-        return_tensors="pt",
-        label_pad_token_id=-100,
-    )
+    # Padding-free packing under FlashAttention-2: each batch becomes one row of back-to-back examples with
+    # position_ids restarting per example, so no pad tokens and no attention across example boundaries.
+    # SDPA/eager would attend across those boundaries, so they keep per-batch padding (grouped by length).
+    use_packing = DataCollatorWithFlattening is not None and get_attn_implementation() == "flash_attention_2"
+    if use_packing:
+        data_collator = DataCollatorWithFlattening(return_position_ids=True)
+    else:
+        data_collator = DataCollatorForSeq2Seq(
+            tokenizer=tokenizer,
+            padding=True,
+            max_length=MAX_SEQ_LEN,
+            return_tensors="pt",
+            label_pad_token_id=-100,
+        )
 
     lora_config = LoraConfig(
         r=LORA_R,
@@ -128,7 +191,19 @@ def main():
         bias="none",
         task_type=TaskType.CAUSAL_LM,
     )
+    # Gradient checkpointing on GPU: recompute activations in backward instead of keeping every layer's activations
+    use_checkpointing = device != "cpu"
+    checkpointing_kwargs = {"use_reentrant": False}
+    if use_qlora:
+        model = prepare_model_for_kbit_training(
+            model,
+            use_gradient_checkpointing=use_checkpointing,
+            gradient_checkpointing_kwargs=checkpointing_kwargs,
+        )
     model = get_peft_model(model, lora_config)
+    if use_checkpointing:
+        # Frozen base: inputs must require grad or checkpointed segments get no gradient path
+        model.enable_input_require_grads()
     model.print_trainable_parameters()
 
     training_args = TrainingArguments(
@@ -141,6 +216,13 @@ def main():
         learning_rate=LEARNING_RATE,
         fp16=False,
         bf16=(device != "cpu"),
+        # Batch similar-length examples together so DataCollatorForSeq2Seq pads less (packed batches have no padding)
+        group_by_length=not use_packing,
+        length_column_name="length",
+        gradient_checkpointing=use_checkpointing,
+        gradient_checkpointing_kwargs=checkpointing_kwargs,
+        # Paged 8-bit AdamW (bitsandbytes, CUDA only): half the optimizer-state bytes, spikes paged to CPU
+        optim="paged_adamw_8bit" if use_qlora else "adamw_torch",
         logging_steps=20,
         save_strategy="steps",
         save_steps=200,
@@ -1,56 +1,78 @@
-"""API smoke: /health, /chat, required JSON keys."""
-import subprocess
-import sys
-import time
+"""API smoke: /health, /chat, /chat/stream, required JSON keys."""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
-import requests
+from fastapi.testclient import TestClient
 
-API_URL = "http://127.0.0.1:8000"
-
-
-def _wait_for_api(timeout: float = 60.0):
-    start = time.time()
-    while time.time() - start < timeout:
-        try:
-            r = requests.get(f"{API_URL}/health", timeout=2)
-            if r.status_code == 200:
-                return True
-        except requests.RequestException:
-            pass
-        time.sleep(0.5)
-    return False
+from src import api
+from src.api import app
 
 
 @pytest.fixture(scope="module")
-def api_server():
-    """Start uvicorn, yield, then terminate."""
-    proc = subprocess.Popen(
-        [sys.executable, "-m", "uvicorn", "src.api:app", "--host", "127.0.0.1", "--port", "8000"],
-        cwd=str(__import__("pathlib").Path(__file__).resolve().parent.parent),
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
-    )
+def client():
+    """Run the app in-process (lifespan loads the shared model once), yield a client, then shut down."""
+    test_client = TestClient(app)
     try:
-        if not _wait_for_api():
-            pytest.skip("API did not become ready in time")
-        yield
+        test_client.__enter__()
+    except Exception as e:
+        pytest.skip(f"API did not start: {e}")
+    try:
+        yield test_client
     finally:
-        proc.terminate()
-        proc.wait(timeout=5)
+        test_client.__exit__(None, None, None)
 
 
-def test_health(api_server):
-    r = requests.get(f"{API_URL}/health", timeout=5)
+def test_health(client):
+    r = client.get("/health")
     assert r.status_code == 200
     data = r.json()
     assert data.get("status") == "ok"
 
 
-def test_chat_returns_required_keys(api_server):
-    r = requests.post(f"{API_URL}/chat", json={"message": "egg, onion"}, timeout=30)
+def test_chat_returns_required_keys(client):
+    r = client.post("/chat", json={"message": "egg, onion"})
     assert r.status_code == 200
     data = r.json()
     required = {"query", "normalized_ingredients", "recipe_title", "ingredients", "steps", "time_minutes", "notes"}
     for key in required:
         assert key in data, f"Response should contain '{key}'"
+
+
+def test_chat_stream_ends_with_result(client):
+    r = client.post("/chat/stream", json={"message": "egg, onion"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n") for block in r.text.strip().split("\n\n")]
+    assert events[-1][0] == "event: result"
+    data = json.loads(events[-1][1][len("data: "):])
+    assert "recipe_title" in data and "steps" in data
+
+
+def test_failed_batch_only_fails_the_bad_request(monkeypatch):
+    def fake_batch(messages, **kwargs):
+        if "bad" in messages:
+            raise RuntimeError("CUDA out of memory")
+        return [{"query": m} for m in messages]
+
+    monkeypatch.setattr(api, "run_inference_batch", fake_batch)
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(api, "_executor", executor)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        batch = [(m, loop.create_future()) for m in ["egg", "bad", "onion"]]
+        slots = asyncio.Semaphore(0)
+        await api._run_and_resolve(batch, slots)
+        assert not slots.locked(), "the batch slot should be released"
+        return [fut for _, fut in batch]
+
+    try:
+        good, bad, other = asyncio.run(run())
+    finally:
+        executor.shutdown()
+    assert good.result() == {"query": "egg"}
+    assert other.result() == {"query": "onion"}
+    with pytest.raises(RuntimeError):
+        bad.result()
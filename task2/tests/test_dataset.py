@@ -1,9 +1,13 @@
 """Dataset format and count (>=600 train, >=60 eval)."""
+import re
+
 import pytest
 from pathlib import Path
 
 from src.config import DATA_DIR, EVAL_JSONL, TRAIN_JSONL
-from src.dataset_format import load_jsonl, validate_record, count_lines
+from src import dataset_format
+from src.dataset_format import load_jsonl, validate_record, count_lines, write_jsonl
+from src.dataset_gen import _INPUT_PHRASES, _normalize_input
 
 
 def test_train_and_eval_files_exist():
@@ -33,3 +37,64 @@ def test_eval_format_input_output_only():
         assert validate_record(record), f"eval record {i} should have only 'input' and 'output' keys"
         if i >= 10:
             break
+
+
+
+def _normalize_input_one_by_one(s: str) -> str:
+    """Reference: the original in-order removal of each phrase (one regex per phrase)."""
+    s = re.sub(r"\s+", " ", s.lower().strip())
+    for phrase in _INPUT_PHRASES:
+        s = re.sub(re.escape(phrase), " ", s, flags=re.IGNORECASE)
+    return re.sub(r"\s+", " ", s).strip()
+
+
+@pytest.mark.parametrize("text", [
+    "egg, onion any ideas?",
+    "I have eggs and rice. Any ideas?",
+    "Got some paneer, peas any ideas?",
+    "Chicken, garlic—what do you recommend?",
+    "chicken, garlic—what do you recommend",
+    # " any ideas?" right after a phrase whose removal supplied the leading space
+    "eggs, I have any ideas?",
+    "egg for dinner.any ideas?",
+    "Got some any ideas?",
+    "What can I make? any ideas?",
+    "I have tomato, onion at home. What can I make?",
+    "Suggest something with   potato for breakfast.",
+    "Quick recipe with egg for dinner any recipe ideas?",
+])
+def test_normalize_input_edge_cases_match_one_by_one_removal(text):
+    assert _normalize_input(text) == _normalize_input_one_by_one(text)
+
+
+def test_normalize_input_matches_one_by_one_removal_on_dataset():
+    for path in (TRAIN_JSONL, EVAL_JSONL):
+        for record in load_jsonl(path):
+            inp = record["input"]
+            assert _normalize_input(inp) == _normalize_input_one_by_one(inp), inp
+
+
+_ROUND_TRIP_RECORDS = [
+    {"input": "egg, onion", "output": "Recipe: Egg Bhurji\nSteps: Chop | Fry"},
+    {"input": "paneer—what do you recommend?", "output": "Tips: use \"fresh\" paneer, ½ tsp salt\t😀"},
+    {"input": "dal, chawal", "output": "Curry leaves \u2028 line sep, slash / back\\slash"},
+]
+
+
+def test_write_jsonl_reads_back(tmp_path):
+    path = tmp_path / "out.jsonl"
+    write_jsonl(path, _ROUND_TRIP_RECORDS)
+    assert list(load_jsonl(path)) == _ROUND_TRIP_RECORDS
+    assert count_lines(path) == len(_ROUND_TRIP_RECORDS)
+
+
+def test_write_jsonl_same_bytes_with_and_without_orjson(tmp_path, monkeypatch):
+    if dataset_format.orjson is None:
+        pytest.skip("orjson not installed")
+    with_orjson = tmp_path / "orjson.jsonl"
+    write_jsonl(with_orjson, _ROUND_TRIP_RECORDS)
+    monkeypatch.setattr(dataset_format, "orjson", None)
+    stdlib = tmp_path / "stdlib.jsonl"
+    write_jsonl(stdlib, _ROUND_TRIP_RECORDS)
+    assert with_orjson.read_bytes() == stdlib.read_bytes()
+    assert list(load_jsonl(stdlib)) == _ROUND_TRIP_RECORDS
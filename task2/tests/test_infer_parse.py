@@ -0,0 +1,58 @@
+"""Output parsing (JSON block scanner, line-based fallback) and text-cache keys; no model needed."""
+import json
+
+from src.infer import _cache_key, _find_json_block, _parse_model_output, _uses_shared_model
+
+
+def test_nested_object_returns_outermost_block():
+    text = 'Sure! {"recipe_title": "Omelette", "meta": {"serves": {"adults": 2}}} Enjoy.'
+    block = _find_json_block(text)
+    assert block == '{"recipe_title": "Omelette", "meta": {"serves": {"adults": 2}}}'
+    assert json.loads(block)["meta"]["serves"]["adults"] == 2
+
+
+def test_braces_inside_strings_are_ignored():
+    text = '{"recipe_title": "Curly } fries {", "notes": "say \\"}\\" twice"} trailing }'
+    block = _find_json_block(text)
+    assert json.loads(block) == {"recipe_title": "Curly } fries {", "notes": 'say "}" twice'}
+
+
+def test_unclosed_earlier_brace_falls_back_to_closed_block():
+    text = 'Note { this never closes. {"recipe_title": "Toast", "steps": ["toast"]}'
+    assert _find_json_block(text) == '{"recipe_title": "Toast", "steps": ["toast"]}'
+
+
+def test_no_json_uses_line_parser():
+    text = "Recipe: Egg Bhurji\nIngredients: egg, onion\nSteps: Chop | Fry | Serve\nTime: 15 minutes\nTips: Add chilli"
+    assert _find_json_block(text) is None
+    result = _parse_model_output(text, "egg, onion")
+    assert result["recipe_title"] == "Egg Bhurji"
+    assert result["ingredients"] == ["egg", "onion"]
+    assert result["steps"] == ["Chop", "Fry", "Serve"]
+    assert result["time_minutes"] == 15
+    assert result["notes"] == "Add chilli"
+
+
+def test_json_block_is_parsed_into_result():
+    text = 'Here you go: {"name": "Egg Fry", "ingredients": "egg, oil", "steps": "Heat | Fry", "tips": "Salt"}'
+    result = _parse_model_output(text, "egg")
+    assert result["recipe_title"] == "Egg Fry"
+    assert result["ingredients"] == ["egg", "oil"]
+    assert result["steps"] == ["Heat", "Fry"]
+    assert result["notes"] == "Salt"
+
+
+def test_cache_key_shares_rewordings():
+    assert _cache_key("I have egg, onion") == _cache_key("egg, onion")
+    assert _cache_key("Please suggest egg, onion") == _cache_key("egg,  onion")
+
+
+def test_cache_key_keeps_prompt_changing_hints():
+    assert _cache_key("eggs for breakfast") != _cache_key("eggs for dinner")
+    assert _cache_key("Quick recipe with egg") != _cache_key("recipe with egg")
+    assert _cache_key("eggs for Dinner.") == _cache_key("I have eggs for dinner")
+
+
+def test_explicit_other_model_bypasses_cache():
+    assert _uses_shared_model(None)
+    assert not _uses_shared_model(object())